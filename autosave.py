@@ -0,0 +1,201 @@
+# autosave.py
+# Crash recovery: every edit is appended to a journal by a background thread, which now and then
+# compacts it into a snapshot. Both files hold JSON-array lines like project.py, plus wire ids:
+#   ["board", version, width, height]        starts a fresh state
+#   ["def", id, {definition}]
+#   ["comp", def_id, uid, x, y, rotation, color, custom_width, custom_height, value]   add or replace
+#   ["del_comp", uid]
+#   ["wire", wid, name, color, side, [x0, y0, x1, y1, ...]]                         add or replace
+#   ["del_wire", wid]
+#   ["nets", [["net", name, [[uid, pin label], ...]], ...]]                         replaces board.imported_nets
+# Replaying the snapshot and then the journal rebuilds the board.
+import json
+import os
+import queue
+import threading
+from project import FORMAT_VERSION, BoardReader
+
+AUTOSAVE_BASE = "autosave"
+COMPACT_EVERY = 2000        # journal records before the writer folds them into a new snapshot
+
+class JournalState:
+    """Latest record per definition, component and wire; applying records is idempotent."""
+    def __init__(self):
+        self.header = None
+        self.defs = {}
+        self.comps = {}
+        self.wires = {}
+        self.nets = []
+
+    def apply(self, rec):
+        kind = rec[0]
+        if kind == "board": self.__init__(); self.header = rec
+        elif kind == "def": self.defs[rec[1]] = rec
+        elif kind == "comp": self.comps[rec[2]] = rec
+        elif kind == "del_comp": self.comps.pop(rec[1], None)
+        elif kind == "wire": self.wires[rec[1]] = rec
+        elif kind == "del_wire": self.wires.pop(rec[1], None)
+        elif kind == "nets": self.nets = rec[1]
+        else: raise ValueError(f"Unknown journal record {kind!r}")
+
+    def records(self):
+        if self.header is None: return
+        yield self.header
+        # Every definition is kept: the editor will not announce one it has journaled before
+        yield from self.defs.values()
+        yield from self.comps.values()
+        yield from self.wires.values()
+        if self.nets: yield ["nets", self.nets]
+
+    def to_board(self, library=None):
+        reader = BoardReader(library)
+        reader.apply(self.header)
+        for rec in self.defs.values(): reader.apply(rec)
+        for rec in self.comps.values(): reader.apply(rec)
+        for rec in self.wires.values(): reader.apply(["wire"] + rec[2:])
+        for rec in self.nets: reader.apply(rec)
+        return reader.board
+
+def _read_into(state, path):
+    try: f = open(path, "r", encoding="utf-8")
+    except FileNotFoundError: return
+    with f:
+        for line in f:
+            try: rec = json.loads(line)
+            except ValueError: break    # torn last line from a crash mid-append
+            state.apply(rec)
+
+def recover(base=AUTOSAVE_BASE, library=None):
+    """The board left behind by a session that did not shut down cleanly, or None.
+    Files that cannot be read back are renamed to *.bad before ValueError is raised, so the next reset()
+    does not delete them and they can still be recovered by hand."""
+    state = JournalState()
+    try:
+        _read_into(state, base + ".snapshot")
+        _read_into(state, base + ".journal")
+        if state.header is None: return None
+        return state.to_board(library)
+    except (OSError, ValueError, KeyError, IndexError, TypeError) as e:
+        kept = []
+        for ext in (".snapshot", ".journal"):
+            if os.path.exists(base + ext):
+                os.replace(base + ext, base + ext + ".bad"); kept.append(base + ext + ".bad")
+        raise ValueError(f"Unreadable autosave ({type(e).__name__}: {e}); kept as {', '.join(kept)}") from e
+
+class Autosave:
+    """Turns board edits into journal records; a daemon thread does all file I/O off the Tk loop."""
+    def __init__(self, base=AUTOSAVE_BASE, compact_every=COMPACT_EVERY):
+        self.base = base
+        self.compact_every = compact_every
+        self._def_ids = {}      # ComponentDefinition -> journal id
+        self._wire_ids = {}     # Wire -> journal id
+        self._next_wid = 0
+        self._imported_nets = {}    # board.imported_nets last journaled
+        self.error = None       # OSError that stopped the last write; None once writing works again (poll it)
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+        self._thread.start()
+
+    # --- Main thread: cheap record building only ---
+    def _comp_records(self, comp):
+        d = comp.definition
+        if d not in self._def_ids:
+            self._def_ids[d] = len(self._def_ids)
+            yield ["def", self._def_ids[d], d.to_dict()]
+        yield ["comp", self._def_ids[d], comp.uid, comp.x, comp.y, comp.rotation,
+               comp.custom_color, comp.custom_width, comp.custom_height, comp.value]
+
+    def _wire_record(self, wire):
+        if wire not in self._wire_ids: self._wire_ids[wire] = self._next_wid; self._next_wid += 1
+        return ["wire", self._wire_ids[wire], wire.name, wire.color, wire.side, wire.coords.tolist()]
+
+    def _nets_record(self, board):
+        self._imported_nets = board.imported_nets
+        return ["nets", [["net", name, [list(m) for m in members]] for name, members in board.imported_nets.items()]]
+
+    def reset(self, board):
+        """Starts the journal over from the whole of board (new or freshly opened)."""
+        self._def_ids = {}; self._wire_ids = {}; self._next_wid = 0
+        self._imported_nets = board.imported_nets     # the dict SetImportedNets swaps out
+        recs = [["board", FORMAT_VERSION, board.width, board.height]]
+        for comp in board.components: recs.extend(self._comp_records(comp))
+        recs.extend(self._wire_record(w) for w in board.wires)
+        if board.imported_nets: recs.append(self._nets_record(board))
+        self._queue.put(("reset", recs))
+
+    def record(self, board, uids=(), wires=()):
+        recs = []
+        for uid in uids:
+            comp = board.get_component(uid)
+            if comp: recs.extend(self._comp_records(comp))
+            else: recs.append(["del_comp", uid])
+        for wire in wires:
+            if board.has_wire(wire): recs.append(self._wire_record(wire))
+            elif wire in self._wire_ids: recs.append(["del_wire", self._wire_ids.pop(wire)])
+        # SetImportedNets swaps in a new dict, so identity tells whether the nets changed
+        if board.imported_nets is not self._imported_nets: recs.append(self._nets_record(board))
+        if recs: self._queue.put(("append", recs))
+
+    def close(self, discard=True):
+        """Flushes pending records; discard=True removes the files (clean shutdown)."""
+        self._queue.put(("close", discard))
+        self._thread.join(timeout=5)
+
+    # --- Writer thread ---
+    def _run(self):
+        state, journal, pending = JournalState(), None, 0
+        broken = False          # a write failed; the files may be behind or end in a torn line
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try: batch.append(self._queue.get_nowait())
+                except queue.Empty: break
+            # The in-memory state takes every record first, so a failed write loses nothing
+            lines, closing = [], None
+            for op, arg in batch:
+                if op == "close": closing = arg; break
+                if op == "reset":
+                    state, lines = JournalState(), []
+                    pending = self.compact_every    # force a snapshot of the new board
+                for rec in arg:
+                    state.apply(rec)
+                    lines.append(json.dumps(rec, separators=(",", ":")) + "\n")
+                pending += len(arg)
+            if closing is None or lines:
+                try: journal, pending = self._write(state, journal, lines, pending, broken)
+                except OSError as e:
+                    # Kept for the app to report; the next batch retries with a fresh snapshot
+                    self.error, broken = e, True
+                    try: journal and journal.close()
+                    except OSError: pass
+                    journal = None
+                else: self.error, broken = None, False
+            if closing is not None:
+                try: journal and journal.close()
+                except OSError: pass
+                if closing:
+                    for ext in (".journal", ".snapshot"):
+                        try: os.remove(self.base + ext)
+                        except OSError: pass
+                return
+
+    def _write(self, state, journal, lines, pending, broken):
+        """Appends lines to the journal, or rewrites the snapshot when due or after a failed write.
+        Returns the open journal and the records it holds."""
+        if broken or pending >= self.compact_every:
+            if journal: journal.close()
+            self._write_snapshot(state)
+            return open(self.base + ".journal", "w", encoding="utf-8"), 0
+        if journal is None: journal = open(self.base + ".journal", "a", encoding="utf-8")
+        journal.writelines(lines)
+        journal.flush()
+        os.fsync(journal.fileno())
+        return journal, pending
+
+    def _write_snapshot(self, state):
+        # Snapshot is swapped in before the journal is emptied; replaying both after a crash in between is harmless
+        tmp = self.base + ".snapshot.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for rec in state.records(): f.write(json.dumps(rec, separators=(",", ":")) + "\n")
+            f.flush(); os.fsync(f.fileno())
+        os.replace(tmp, self.base + ".snapshot")
@@ -0,0 +1,140 @@
+# batch.py
+# Display-free export of many boards at once, spread over a process pool.
+#   python main.py batch-export boards/ "revs/*.pcb" --out-dir sheets --jobs 8
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from library import LIBRARY_DIR, load_library
+from project import PROJECT_EXT, load_board
+from renderer import BACKENDS, export_board
+
+MANIFEST_FILE = ".export_manifest.json"
+MANIFEST_SAVE_S = 2.0       # during a run the manifest is rewritten at most this often
+VIEWS = ("front", "back")
+
+def _glob_root(pattern):
+    """The directory part of a glob pattern before its first wildcard ("revs/*.pcb" -> "revs")."""
+    parts = []
+    for part in os.path.dirname(pattern).split(os.sep):
+        if any(ch in part for ch in "*?["): break
+        parts.append(part)
+    return os.sep.join(parts) or "."
+
+def find_boards(sources):
+    """Expands directories (recursively) and glob patterns into a sorted list of (project file, root) pairs.
+    The root is the source directory, or a pattern's directory up to its first wildcard; outputs are named
+    from the path under it, so they do not change when other boards come or go."""
+    found = {}
+    for src in sources:
+        if os.path.isdir(src):
+            root, paths = src, glob.glob(os.path.join(src, "**", f"*{PROJECT_EXT}"), recursive=True)
+        else:
+            root, paths = _glob_root(src), [p for p in glob.glob(src, recursive=True) if os.path.isfile(p)]
+        for p in paths: found.setdefault(os.path.abspath(p), os.path.abspath(root))
+    return sorted(found.items())
+
+def content_hash(path, settings):
+    h = hashlib.sha256(settings.encode())
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""): h.update(chunk)
+    return h.hexdigest()
+
+def root_names(roots):
+    """{root: name used in output names}: the directory's own name, plus a hash of its full path for roots that
+    share a name, so equal file names from different sources do not collide."""
+    names = {root: os.path.basename(root) or "root" for root in set(roots)}
+    shared = {n for n, k in Counter(names.values()).items() if k > 1}
+    return {root: f"{n}~{hashlib.sha1(root.encode()).hexdigest()[:8]}" if n in shared else n for root, n in names.items()}
+
+def output_paths(board_path, root, out_dir, ext, root_name=None):
+    # Sub-directories stay in the name too, flattened, so every board under a root gets its own files
+    rel = os.path.splitext(os.path.relpath(board_path, root))[0].replace(os.sep, "__")
+    name = root_name or os.path.basename(root) or "root"
+    return [(view, os.path.join(out_dir, f"{name}__{rel}_{view}{ext}")) for view in VIEWS]
+
+# --- Worker side ---
+_library = None
+
+def _init_worker(library_path):
+    # Once per process: every board this worker renders shares the index and its cached definitions
+    global _library
+    _library = load_library(library_path)
+
+def _export_one(board_path, outputs, cell_size):
+    board = load_board(board_path, _library)
+    for view, out in outputs: export_board(board, out, view, cell_size)
+    return board_path
+
+# --- Parent side ---
+def _load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST_FILE), "r") as f: return json.load(f)
+    except (OSError, ValueError): return {}
+
+def _save_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST_FILE)
+    with open(path + ".tmp", "w") as f: json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+def batch_export(boards, out_dir, ext=".svg", cell_size=30, jobs=None, library_path=LIBRARY_DIR, force=False, log=print):
+    """Exports front and back views of every (board, root) from find_boards. Returns (exported, skipped, failed) counts.
+    The manifest is saved as results come in, so an interrupted run keeps what it finished."""
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = _load_manifest(out_dir)
+    names = root_names(root for _, root in boards)
+    settings = f"{ext}|{cell_size}"
+
+    todo = []; skipped = 0
+    for board, root in boards:
+        outputs = output_paths(board, root, out_dir, ext, names[root])
+        digest = content_hash(board, settings)
+        entry = manifest.get(board)
+        if not force and entry and entry.get("hash") == digest and all(os.path.exists(o) for _, o in outputs):
+            skipped += 1
+            continue
+        todo.append((board, outputs, digest))
+
+    exported = failed = 0
+    if not todo: return exported, skipped, failed
+    saved = time.monotonic()
+    try:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(library_path,)) as pool:
+            futures = {pool.submit(_export_one, board, outputs, cell_size): (board, outputs, digest) for board, outputs, digest in todo}
+            for fut in as_completed(futures):
+                board, outputs, digest = futures[fut]
+                try: fut.result()
+                except Exception as e:
+                    failed += 1
+                    log(f"FAILED {board}: {e}")
+                    continue
+                exported += 1
+                manifest[board] = {"hash": digest, "outputs": [o for _, o in outputs]}
+                log(f"ok {board}")
+                if time.monotonic() - saved > MANIFEST_SAVE_S:
+                    _save_manifest(out_dir, manifest); saved = time.monotonic()
+    finally: _save_manifest(out_dir, manifest)
+    return exported, skipped, failed
+
+def batch_main(argv):
+    """Command line: main.py batch-export SOURCE... [--out-dir DIR] [--format svg|ps|eps] [--jobs N]"""
+    ap = argparse.ArgumentParser(prog="main.py batch-export", description="Export front/back sheets for many boards in parallel.")
+    ap.add_argument("sources", nargs="+", help=f"directories (searched for *{PROJECT_EXT}) or glob patterns")
+    ap.add_argument("--out-dir", default="exports")
+    ap.add_argument("--format", choices=[e.lstrip(".") for e in BACKENDS], default="svg")
+    ap.add_argument("--cell-size", type=int, default=30)
+    ap.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    ap.add_argument("--library", default=LIBRARY_DIR, help="user component library directory")
+    ap.add_argument("--force", action="store_true", help="re-export boards even if unchanged")
+    args = ap.parse_args(argv)
+
+    boards = find_boards(args.sources)
+    if not boards: ap.exit(1, "error: no board files found\n")
+    exported, skipped, failed = batch_export(boards, args.out_dir, "." + args.format, args.cell_size, args.jobs, args.library, args.force)
+    print(f"{exported} exported, {skipped} unchanged, {failed} failed")
+    return 1 if failed else 0
@@ -0,0 +1,256 @@
+# bench.py
+# Headless benchmarks: seeded synthetic boards, PCBStudioApp drawing into a recording canvas.
+#   python bench.py --out bench.json                  run and save results
+#   python bench.py --sizes small,medium --compare bench.json   run and show the change per benchmark
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+from main import PCBStudioApp
+from models import Board, PlacedComponent, Wire
+from library import default_library
+
+# name: (width, height, components, wires)
+BOARD_SIZES = {
+    "small": (30, 20, 40, 30),
+    "medium": (100, 100, 500, 400),
+    "large": (300, 300, 5000, 4000),
+    "huge": (1000, 1000, 50000, 40000),
+}
+
+# --- Stand-ins for Tk ---
+class RecordingCanvas:
+    """Just enough of tk.Canvas for PCBStudioApp: keeps items and tags, counts every call."""
+    def __init__(self, width=1150, height=850):
+        self.width, self.height = width, height
+        self.items = {}         # id -> (kind, tags)
+        self.tagged = {}        # tag -> ids
+        self.calls = Counter()
+        self._next = 1
+
+    def reset_counts(self): self.calls.clear()
+    def winfo_width(self): return self.width
+    def winfo_height(self): return self.height
+    def config(self, **kw): self.calls["config"] += 1
+    def bind(self, *a, **kw): pass
+
+    def _create(self, kind, kw):
+        self.calls["create_" + kind] += 1
+        tags = kw.get("tags", ())
+        if isinstance(tags, str): tags = (tags,)
+        i = self._next; self._next += 1
+        self.items[i] = (kind, tags)
+        for t in tags: self.tagged.setdefault(t, set()).add(i)
+        return i
+
+    def create_line(self, *a, **kw): return self._create("line", kw)
+    def create_rectangle(self, *a, **kw): return self._create("rectangle", kw)
+    def create_oval(self, *a, **kw): return self._create("oval", kw)
+    def create_text(self, *a, **kw): return self._create("text", kw)
+    def create_image(self, *a, **kw): return self._create("image", kw)
+
+    def _ids(self, tag):
+        if tag == "all": return list(self.items)
+        if isinstance(tag, int): return [tag] if tag in self.items else []
+        return list(self.tagged.get(tag, ()))
+
+    def delete(self, *tags):
+        self.calls["delete"] += 1
+        for tag in tags:
+            for i in self._ids(tag):
+                for t in self.items.pop(i)[1]:
+                    ids = self.tagged[t]; ids.discard(i)
+                    if not ids: del self.tagged[t]
+
+    def move(self, tag, dx, dy): self.calls["move"] += 1
+    def scale(self, tag, *a): self.calls["scale"] += 1
+    def coords(self, tag, *a): self.calls["coords"] += 1
+    def itemconfig(self, tag, **kw): self.calls["itemconfig"] += 1
+    def tag_lower(self, tag, below=None): self.calls["tag_lower"] += 1
+
+class FakeRoot:
+    """Timers are queued, not run; benchmarks call the frame/settle work explicitly."""
+    def __init__(self): self.jobs = {}; self._n = 0
+    def after(self, ms, fn=None, *a):
+        self._n += 1; self.jobs[self._n] = (fn, a); return self._n
+    def after_idle(self, fn, *a): return self.after(0, fn, *a)
+    def after_cancel(self, job): self.jobs.pop(job, None)
+    def run_pending(self):
+        while self.jobs:
+            fn, a = self.jobs.pop(next(iter(self.jobs))); fn(*a)
+    def title(self, *a): pass
+    def geometry(self, *a): pass
+    def bind(self, *a, **kw): pass
+    def protocol(self, *a): pass
+
+class _Label:
+    def config(self, **kw): pass
+
+class _NoAutosave:
+    def reset(self, board): pass
+    def record(self, board, uids=(), wires=()): pass
+    def close(self, discard=True): pass
+
+class BenchApp(PCBStudioApp):
+    """The real application with widgets, key bindings and autosave replaced by recording stand-ins."""
+    def _setup_ui(self):
+        self.canvas = RecordingCanvas()
+        self.lbl_status = _Label()
+        self.browser = None
+    def _bind_events(self): pass
+    def _start_autosave(self): self.autosave = _NoAutosave()
+
+# --- Synthetic boards ---
+def make_board(width, height, n_comps, n_wires, seed=0):
+    """Random parts (all rotations) packed where they fit, and short 2-4 point wires. Same seed, same board."""
+    rng = random.Random(seed)
+    board = Board(width, height)
+    defs = list(default_library().values())
+    placed = tries = 0
+    while placed < n_comps and tries < n_comps * 4:
+        tries += 1
+        comp = PlacedComponent(rng.choice(defs), rng.randrange(width), rng.randrange(height), f"u{placed}", rng.choice((0, 90, 180, 270)))
+        if board.add_component_instance(comp): placed += 1
+    for i in range(n_wires):
+        x, y = rng.randrange(width), rng.randrange(height)
+        points = [(x, y)]
+        for _ in range(rng.randint(1, 3)):
+            x = min(width - 1, max(0, x + rng.randint(-6, 6))); y = min(height - 1, max(0, y + rng.randint(-6, 6)))
+            points.append((x, y))
+        board.add_wire(Wire(points, f"N{i}", "#C0392B", rng.choice(("front", "back"))))
+    return board
+
+# --- Benchmarks ---
+def _time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter(); fn(); times.append(time.perf_counter() - t)
+    return min(times), statistics.median(times)
+
+def _screen(app, x, y):
+    class Event: pass
+    e = Event(); sz = app.cell_size * app.scale
+    e.x, e.y = app.offset_x + x * sz, app.offset_y + y * sz
+    return e
+
+def board_memory(width, height, n_comps, n_wires, seed=0):
+    """Bytes allocated and still held after building the board: model objects plus the board's indexes."""
+    tracemalloc.start()
+    try:
+        board = make_board(width, height, n_comps, n_wires, seed)
+        return tracemalloc.get_traced_memory()[0]
+    finally: tracemalloc.stop()
+
+def run_size(name, seed=0, repeat=5, ops=500, memory=False, log=print):
+    width, height, n_comps, n_wires = BOARD_SIZES[name]
+    t = time.perf_counter()
+    board = make_board(width, height, n_comps, n_wires, seed)
+    build = time.perf_counter() - t
+    app = BenchApp(FakeRoot())
+    app.set_board(board)
+    rng = random.Random(seed + 1)
+    cells = [(rng.randrange(width), rng.randrange(height)) for _ in range(ops)]
+    points = [(rng.uniform(0, width - 1), rng.uniform(0, height - 1)) for _ in range(ops)]
+    base = {"board": name, "width": width, "height": height,
+            "components": len(board.components), "wires": len(board.wires)}
+    results = [dict(base, bench="build_board", ops=1, best_s=build, median_s=build)]
+    if memory:
+        # Built again under tracemalloc, which would distort the timings above
+        mem = board_memory(width, height, n_comps, n_wires, seed)
+        segments = sum(len(w.points) - 1 for w in board.wires)
+        results.append(dict(base, bench="board_memory", ops=1, best_s=0.0, median_s=0.0, mem_bytes=mem))
+        log(f"{name:>6} {'board_memory':<18} {mem/1e6:10.2f} MB  {mem/max(1, segments):10.1f} B/wire segment")
+
+    def record(bench, fn, n_ops, rep=repeat):
+        app.canvas.reset_counts()
+        best, median = _time(fn, rep)
+        calls = app.canvas.calls
+        row = dict(base, bench=bench, ops=n_ops, best_s=best, median_s=median, per_op_us=best / n_ops * 1e6,
+                   items=len(app.canvas.items), created_per_run=sum(v for k, v in calls.items() if k.startswith("create_")) // rep,
+                   restacked_per_run=calls["tag_lower"] // rep)     # each one walks Tk's display list
+        results.append(row)
+        log(f"{name:>6} {bench:<18} {best*1000:10.2f} ms  {row['per_op_us']:10.1f} us/op  items={row['items']}  restacked={row['restacked_per_run']}")
+
+    def redraw_at(scale):
+        def run(): app.scale = scale; app.redraw_all()
+        return run
+    record("redraw", redraw_at(1.0), 1)
+    record("redraw_zoom_0.4", redraw_at(0.4), 1)
+    app.scale = 1.0; app.redraw_all()
+
+    def pan():
+        for i in range(ops):
+            app.pan_by(3 if i % 50 < 25 else -3, 2 if i % 40 < 20 else -2)
+            if i % 8 == 0: app._render_frame()     # several motion events per frame, as in practice
+        app._render_frame()
+    record("pan_frames", pan, ops)
+    record("hit_component", lambda: [board.get_component_at(x, y) for x, y in cells], ops)
+    record("hit_wire", lambda: [board.get_wire_at(x, y) for x, y in points], ops)
+
+    # Edits go through the same click handlers as the UI; each run undoes itself so repeats see the same board
+    def place():
+        app.set_mode("PLACE")
+        before = len(app.history._undo)
+        for x, y in cells[:100]: app.on_click(_screen(app, x, y))
+        for _ in range(len(app.history._undo) - before): app.undo()
+    record("place_click", place, 100)
+
+    def wires():
+        app.set_mode("WIRE")
+        before = len(app.history._undo)
+        for i in range(0, 100, 2):
+            (x1, y1), (x2, y2) = cells[i], cells[i + 1]
+            app.current_wire_points = [(x1, y1), (x2, y2)]
+            app.finish_wire()
+        for _ in range(len(app.history._undo) - before): app.undo()
+        app.set_mode("SELECT")
+    record("finish_wire", wires, 50)
+    return results
+
+def _git_rev():
+    try: return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError): return None
+
+def compare(old, new, log=print):
+    """Prints best-time ratios new/old for benchmarks present in both result lists."""
+    before = {(r["board"], r["bench"]): r for r in old}
+    for r in new:
+        o = before.get((r["board"], r["bench"]))
+        if o and o.get("mem_bytes") and "mem_bytes" in r:
+            log(f"{r['board']:>6} {r['bench']:<18} {o['mem_bytes']/1e6:10.2f} -> {r['mem_bytes']/1e6:10.2f} MB  x{r['mem_bytes']/o['mem_bytes']:.2f}")
+        elif o and o["best_s"] > 0:
+            ratio = r["best_s"] / o["best_s"]
+            flag = "  SLOWER" if ratio > 1.1 else "  faster" if ratio < 0.9 else ""
+            log(f"{r['board']:>6} {r['bench']:<18} {o['best_s']*1000:10.2f} -> {r['best_s']*1000:10.2f} ms  x{ratio:.2f}{flag}")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark redraw, hit tests and edits on synthetic boards.")
+    ap.add_argument("--sizes", default="small,medium,large", help=f"comma list of {', '.join(BOARD_SIZES)}")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--ops", type=int, default=500, help="hit tests / pan steps per run")
+    ap.add_argument("--memory", action="store_true", help="also measure board memory (builds each board twice)")
+    ap.add_argument("--out", help="write results as JSON")
+    ap.add_argument("--compare", help="earlier JSON results to compare against")
+    args = ap.parse_args(argv)
+
+    results = []
+    for name in args.sizes.split(","): results.extend(run_size(name.strip(), args.seed, args.repeat, args.ops, args.memory))
+    report = {"meta": {"git": _git_rev(), "python": platform.python_version(), "platform": platform.platform(),
+                       "seed": args.seed, "repeat": args.repeat, "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+              "results": results}
+    if args.out:
+        with open(args.out, "w") as f: json.dump(report, f, indent=1)
+    if args.compare:
+        with open(args.compare, "r") as f: compare(json.load(f)["results"], results)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+# blocks.py
+# Step and repeat: copies of a block of parts and wires laid out on a grid, e.g. the channels of a driver board.
+from models import PlacedComponent, Wire
+
+def block_bounds(comps, wires):
+    """Inclusive cell rect (x1, y1, x2, y2) around the parts' bodies and the wires' points, or None if empty."""
+    cells = [(x, y) for c in comps for x, y in ((c.x, c.y), (c.x + c.width - 1, c.y + c.height - 1))]
+    cells += [p for w in wires for p in w.points]
+    if not cells: return None
+    xs, ys = [x for x, _ in cells], [y for _, y in cells]
+    return min(xs), min(ys), max(xs), max(ys)
+
+def turn(u, v, width, height, rotation):
+    """Cell (u, v) of a width x height box after turning the box clockwise; the result is in the turned box."""
+    if rotation == 90: return height - 1 - v, u
+    if rotation == 180: return width - 1 - u, height - 1 - v
+    if rotation == 270: return v, width - 1 - u
+    return u, v
+
+def step_repeat(comps, wires, cols, rows, pitch_x, pitch_y, rotation=0):
+    """New parts and wires for a cols x rows array of the block, nothing added to the board yet.
+
+    Grid position (0, 0) is the original block and is not copied. The copy at (i, j) is the block turned
+    clockwise by rotation inside its bounding box, with that box's corner moved by (i * pitch_x, j * pitch_y).
+    Parts get uid None, so the board numbers them only once they are added; copy k's wires are named "<name>_<k>" so each copy keeps its own nets."""
+    bounds = block_bounds(comps, wires)
+    if bounds is None: return [], []
+    x1, y1, x2, y2 = bounds
+    w, h = x2 - x1 + 1, y2 - y1 + 1
+    new_comps, new_wires = [], []
+    k = 0
+    for j in range(rows):
+        for i in range(cols):
+            if i == 0 and j == 0: continue
+            k += 1
+            ox, oy = x1 + i * pitch_x, y1 + j * pitch_y
+            for c in comps:
+                # A part's new top-left is the smaller corner of its turned body
+                (ax, ay), (bx, by) = (turn(x - x1, y - y1, w, h, rotation) for x, y in ((c.x, c.y), (c.x + c.width - 1, c.y + c.height - 1)))
+                new_comps.append(PlacedComponent(c.definition, ox + min(ax, bx), oy + min(ay, by), None,
+                                                 (c.rotation + rotation) % 360, c.custom_color, c.custom_width, c.custom_height, c.value))
+            for wire in wires:
+                points = [turn(x - x1, y - y1, w, h, rotation) for x, y in wire.points]
+                new_wires.append(Wire([(ox + u, oy + v) for u, v in points], f"{wire.name}_{k}", wire.color, wire.side))
+    return new_comps, new_wires
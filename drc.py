@@ -0,0 +1,128 @@
+# drc.py
+# Incremental design-rule checking. Each edit re-checks only the wires and cells it touched.
+from collections import namedtuple
+
+# where: logical (x, y) points to mark; may be fractional for segment crossings
+Violation = namedtuple("Violation", ["rule", "message", "where"])
+
+def _orient(a, b, c): return (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+
+def _on_segment(a, b, p):
+    return min(a[0], b[0]) <= p[0] <= max(a[0], b[0]) and min(a[1], b[1]) <= p[1] <= max(a[1], b[1])
+
+def segment_contact(p1, p2, q1, q2):
+    """Where two segments touch other than at an endpoint they share, or None."""
+    # Canonical order, so the crossing point comes out bit-identical whichever wire is checked first
+    (p1, p2), (q1, q2) = sorted((tuple(sorted((tuple(p1), tuple(p2)))), tuple(sorted((tuple(q1), tuple(q2))))))
+    d1, d2 = _orient(q1, q2, p1), _orient(q1, q2, p2)
+    d3, d4 = _orient(p1, p2, q1), _orient(p1, p2, q2)
+    if d1 * d2 < 0 and d3 * d4 < 0:
+        t = d1 / (d1 - d2)
+        return p1[0] + t * (p2[0] - p1[0]), p1[1] + t * (p2[1] - p1[1])
+    shared = {p1, p2} & {q1, q2}
+    for d, p, (a, b) in ((d1, p1, (q1, q2)), (d2, p2, (q1, q2)), (d3, q1, (p1, p2)), (d4, q2, (p1, p2))):
+        if d == 0 and p not in shared and _on_segment(a, b, p): return p
+    return None
+
+class DesignRuleChecker:
+    """Keeps the current violations of a board up to date.
+
+    Rules:
+    - endpoint: a wire ends on a component body cell that is not a pin
+    - crossing: two wires on the same side touch away from a shared point (an unrecorded joint)
+    - short: wires with different names are joined into one net
+
+    Overlapping bodies are rejected by Board itself, so they are not re-checked here.
+    """
+    def __init__(self, board):
+        self.board = board
+        self.violations = {}    # key -> Violation
+        self._keys_by_wire = {} # wire -> keys of violations that involve it
+        self._key_wires = {}    # key -> wires it involves
+        self._wire_cells = {}   # wire -> its points at its last check
+        self._comp_cells = {}   # uid -> body cells at its last check
+        self._changed = set()
+
+    def run_all(self):
+        for key in list(self.violations): self._drop(key)
+        self._wire_cells.clear(); self._comp_cells.clear()
+        for comp in self.board.components: self._comp_cells[comp.uid] = [(x, y) for x, y, _ in comp.iter_cells()]
+        for wire in self.board.wires: self.wire_changed(wire)
+
+    def take_changes(self):
+        """Keys added, replaced or removed since the last call."""
+        changed, self._changed = self._changed, set()
+        return changed
+
+    # --- Bookkeeping ---
+    def _add(self, key, violation, wires):
+        if key in self.violations: self._drop(key)
+        self.violations[key] = violation
+        self._key_wires[key] = list(wires)
+        for w in wires: self._keys_by_wire.setdefault(w, set()).add(key)
+        self._changed.add(key)
+
+    def _drop(self, key):
+        if self.violations.pop(key, None) is None: return
+        for w in self._key_wires.pop(key, ()):
+            keys = self._keys_by_wire.get(w)
+            if keys is not None:
+                keys.discard(key)
+                if not keys: del self._keys_by_wire[w]
+        self._changed.add(key)
+
+    def _drop_for_wire(self, wire, rules):
+        for key in [k for k in self._keys_by_wire.get(wire, ()) if k[0] in rules]: self._drop(key)
+
+    # --- Edits ---
+    def wire_changed(self, wire):
+        """Call after a wire was added, removed or edited."""
+        old_cells = self._wire_cells.pop(wire, [])
+        self._drop_for_wire(wire, ("endpoint", "crossing", "short"))
+        alive = self.board.has_wire(wire)
+        if alive:
+            self._wire_cells[wire] = wire.points
+            self._check_endpoints(wire)
+            self._check_crossings(wire)
+        self._check_shorts(set(old_cells) | set(self._wire_cells.get(wire, ())))
+
+    def component_changed(self, uid):
+        """Call after a component was added, removed, moved or resized."""
+        comp = self.board.get_component(uid)
+        cells = set(self._comp_cells.pop(uid, []))
+        if comp:
+            self._comp_cells[uid] = [(x, y) for x, y, _ in comp.iter_cells()]
+            cells.update(self._comp_cells[uid])
+        for cell in cells:
+            for wire in self.board.wires_at(*cell):
+                self._drop_for_wire(wire, ("endpoint",))
+                self._check_endpoints(wire)
+
+    # --- Rules ---
+    def _check_endpoints(self, wire):
+        if not wire.points: return
+        for end, (x, y) in ((0, wire.start_term), (1, wire.end_term)):
+            if self.board.is_location_blocked(x, y) and self.board.get_pin_obj_at(x, y)[1] is None:
+                comp = self.board.get_component_at(x, y)
+                self._add(("endpoint", id(wire), end), Violation("endpoint", f"{wire.name} ends on the body of {comp.uid}", [(x, y)]), [wire])
+
+    def _check_crossings(self, wire):
+        points = wire.points
+        for other, i, j in self.board.segment_pairs_near(wire):
+            if other.side != wire.side: continue
+            theirs = other.points
+            hit = segment_contact(points[i], points[i+1], theirs[j], theirs[j+1])
+            if hit is None: continue
+            (a, _, w1), (b, _, w2) = sorted((((id(wire), i), 0, wire), ((id(other), j), 1, other)))
+            self._add(("crossing", a, b), Violation("crossing", f"{w1.name} touches {w2.name} on the {wire.side} side", [hit]), [wire, other])
+
+    def _check_shorts(self, cells):
+        nets = set(n for n in (self.board.net_at(*c) for c in cells) if n is not None)
+        for net in nets:
+            wires = self.board.net_wires(net)
+            for w in wires: self._drop_for_wire(w, ("short",))
+            if len(set(w.name for w in wires)) < 2: continue
+            # Mark the joints where differently named wires meet
+            where = [c for c in self.board.connectivity.net_cells(net) if len(set(w.name for w in self.board.wires_at(*c))) > 1]
+            names = ", ".join(sorted(set(w.name for w in wires)))
+            self._add(("short", net), Violation("short", f"Nets shorted together: {names}", where), wires)
@@ -0,0 +1,256 @@
+# history.py
+# Undo/redo as a log of small deltas. Each command stores only the attributes it changed,
+# so undoing costs the same on any board size and long sessions stay small.
+from collections import deque
+
+HISTORY_LIMIT = 500         # undo steps kept
+HISTORY_POINT_BUDGET = 100000   # wire points held by the log before old steps are dropped
+
+COMPONENT_FIELDS = ("x", "y", "rotation", "custom_color", "value", "custom_width", "custom_height")
+GEOMETRY_FIELDS = {"x", "y", "rotation", "custom_width", "custom_height"}
+WIRE_FIELDS = ("points", "name", "color", "side")
+
+class Command:
+    """One undoable edit. redo/undo return the touched (uids, wires), or None if the edit could not be applied."""
+    merge_key = None        # consecutive commands with the same key may fold into one step
+    cost = 1
+    view_only = False       # changes only the view: keeps the redo stack and has its own step limit
+
+    def redo(self): raise NotImplementedError
+    def undo(self): raise NotImplementedError
+    def merge(self, other): return False
+
+class AddComponent(Command):
+    # seq: the part's draw-order place when it was taken off, so putting it back keeps its stacking
+    def __init__(self, board, comp): self.board, self.comp, self.seq = board, comp, None
+    def redo(self): return ([self.comp.uid], ()) if self.board.add_component_instance(self.comp, self.seq) else None
+    def undo(self):
+        self.seq = self.board.comp_seq(self.comp.uid)
+        self.board.remove_component(self.comp.uid)
+        return [self.comp.uid], ()
+
+class RemoveComponent(AddComponent):
+    redo, undo = AddComponent.undo, AddComponent.redo
+
+class AddWire(Command):
+    def __init__(self, board, wire):
+        self.board, self.wire, self.seq = board, wire, None
+        self.cost = len(wire.points)
+    def redo(self):
+        self.board.add_wire(self.wire, self.seq)
+        return (), [self.wire]
+    def undo(self):
+        self.seq = self.board.wire_seq(self.wire)
+        self.board.remove_wire(self.wire)
+        return (), [self.wire]
+
+class RemoveWire(AddWire):
+    redo, undo = AddWire.undo, AddWire.redo
+
+class AddGroup(Command):
+    """New parts and wires as one step. The parts are checked together and go in all at once or not at all."""
+    def __init__(self, board, comps, wires=()):
+        self.board, self.comps, self.wires = board, list(comps), list(wires)
+        self.seqs = None        # draw-order places when taken off, as in AddComponent
+        self.cost = len(self.comps) + sum(len(w.points) for w in self.wires)
+    def redo(self):
+        comp_seqs, wire_seqs = self.seqs or (None, None)
+        if not self.board.add_components(self.comps, comp_seqs): return None
+        self.board.add_wires(self.wires, wire_seqs)
+        return [c.uid for c in self.comps], list(self.wires)
+    def undo(self):
+        self.seqs = [self.board.comp_seq(c.uid) for c in self.comps], [self.board.wire_seq(w) for w in self.wires]
+        for comp in self.comps: self.board.remove_component(comp.uid)
+        self.board.remove_wires(self.wires)
+        return [c.uid for c in self.comps], list(self.wires)
+
+class RemoveGroup(AddGroup):
+    """Parts and wires deleted as one step; the wires leave in one pass over the board's wire list."""
+    redo, undo = AddGroup.undo, AddGroup.redo
+
+class EditComponent(Command):
+    """Sets some of COMPONENT_FIELDS; a change that no longer fits the board is refused."""
+    def __init__(self, board, comp, merge_key=None, **changes):
+        self.board, self.comp, self.merge_key = board, comp, merge_key
+        self.after = changes
+        self.before = {k: getattr(comp, k) for k in changes}
+
+    def _set(self, values):
+        old = {k: getattr(self.comp, k) for k in values}
+        for k, v in values.items(): setattr(self.comp, k, v)
+        if GEOMETRY_FIELDS.isdisjoint(values) or self.board.update_component(self.comp): return [self.comp.uid], ()
+        for k, v in old.items(): setattr(self.comp, k, v)
+        return None
+
+    def redo(self): return self._set(self.after)
+    def undo(self): return self._set(self.before)
+    def merge(self, other):
+        if other.comp is not self.comp or other.after.keys() != self.after.keys(): return False
+        self.after = other.after
+        return True
+
+class EditWire(Command):
+    """Sets some of WIRE_FIELDS. Point lists are replaced, never mutated, so both sides of the delta stay valid."""
+    def __init__(self, board, wire, merge_key=None, **changes):
+        self.board, self.wire, self.merge_key = board, wire, merge_key
+        if "points" in changes: changes["points"] = list(changes["points"])
+        self.after = changes
+        self.before = {k: getattr(wire, k) for k in changes}
+        self.cost = 2 * len(changes.get("points", ())) or 1
+
+    def _set(self, values):
+        for k, v in values.items(): setattr(self.wire, k, v)
+        if "points" in values: self.board.update_wire(self.wire)
+        return (), [self.wire]
+
+    def redo(self): return self._set(self.after)
+    def undo(self): return self._set(self.before)
+    def merge(self, other):
+        if other.wire is not self.wire or other.after.keys() != self.after.keys(): return False
+        self.after = other.after
+        return True
+
+class EditGroup(Command):
+    """EditComponent and EditWire for many items as one model update, e.g. moving a selection.
+    comps and wires map each item to its changes. The parts are re-indexed together, so they may move
+    through each other's cells; if any of them no longer fits, nothing changes."""
+    def __init__(self, board, comps=None, wires=None, merge_key=None):
+        self.board, self.merge_key = board, merge_key
+        wires = {w: dict(ch, points=list(ch["points"])) if "points" in ch else ch for w, ch in (wires or {}).items()}
+        self.after = (dict(comps or {}), wires)
+        self.before = tuple({item: {k: getattr(item, k) for k in ch} for item, ch in side.items()} for side in self.after)
+        self.cost = len(self.after[0]) + sum(2 * len(ch.get("points", ())) or 1 for ch in wires.values())
+
+    def _set(self, values):
+        comps, wires = values
+        old = {c: {k: getattr(c, k) for k in ch} for c, ch in comps.items()}
+        for c, ch in comps.items():
+            for k, v in ch.items(): setattr(c, k, v)
+        moved = [c for c, ch in comps.items() if not GEOMETRY_FIELDS.isdisjoint(ch)]
+        if moved and not self.board.update_components(moved):
+            for c, ch in old.items():
+                for k, v in ch.items(): setattr(c, k, v)
+            return None
+        for w, ch in wires.items():
+            for k, v in ch.items(): setattr(w, k, v)
+            if "points" in ch: self.board.update_wire(w)
+        return [c.uid for c in comps], list(wires)
+
+    def redo(self): return self._set(self.after)
+    def undo(self): return self._set(self.before)
+    def merge(self, other):
+        shape = lambda cmd: [{item: ch.keys() for item, ch in side.items()} for side in cmd.after]
+        if shape(other) != shape(self): return False
+        self.after = other.after
+        return True
+
+class SetImportedNets(Command):
+    """Replaces board.imported_nets. Touches no part or wire; batch it with the edit that goes with it."""
+    def __init__(self, board, nets): self.board, self.after, self.before = board, nets, board.imported_nets
+    def redo(self):
+        self.board.imported_nets = self.after
+        return (), ()
+    def undo(self):
+        self.board.imported_nets = self.before
+        return (), ()
+
+class Batch(Command):
+    """Several commands as one undo step. All or nothing: if one is refused, the ones before it are undone."""
+    def __init__(self, commands):
+        self.commands = list(commands)
+        self.cost = sum(c.cost for c in self.commands)
+
+    def _run(self, commands, forward):
+        uids, wires, done = {}, {}, []
+        for cmd in commands:
+            touched = cmd.redo() if forward else cmd.undo()
+            if touched is None:
+                for c in reversed(done): c.undo() if forward else c.redo()
+                return None
+            done.append(cmd)
+            uids.update(dict.fromkeys(touched[0])); wires.update(dict.fromkeys(touched[1]))
+        return list(uids), list(wires)
+
+    def redo(self): return self._run(self.commands, True)
+    def undo(self): return self._run(reversed(self.commands), False)
+
+class PanView(Command):
+    """View offset change; view needs pan_by(dx, dy). Touches nothing on the board."""
+    merge_key = "pan"
+    cost = 0
+    view_only = True
+    def __init__(self, view, dx, dy): self.view, self.dx, self.dy = view, dx, dy
+    def redo(self):
+        self.view.pan_by(self.dx, self.dy)
+        return (), ()
+    def undo(self):
+        self.view.pan_by(-self.dx, -self.dy)
+        return (), ()
+    def merge(self, other):
+        self.dx += other.dx; self.dy += other.dy
+        return True
+
+class History:
+    """Bounded undo/redo stacks. Commands pushed between two seal() calls with equal merge keys become one step.
+    View-only steps (pans) are kept alongside, but neither clear the redo stack nor push board edits out:
+    each kind has its own limit."""
+    def __init__(self, limit=HISTORY_LIMIT, point_budget=HISTORY_POINT_BUDGET):
+        self.limit = limit
+        self.point_budget = point_budget
+        self._undo = deque()
+        self._redo = []
+        self._cost = 0
+        self._views = 0         # view-only commands in the undo stack
+        self._open = False      # top of the undo stack may still absorb the current gesture
+
+    def do(self, cmd):
+        touched = cmd.redo()
+        if touched is None: return None
+        if not cmd.view_only: self._redo.clear()
+        top = self._undo[-1] if self._undo else None
+        if self._open and cmd.merge_key is not None and top.merge_key == cmd.merge_key and top.merge(cmd):
+            return touched
+        self._push(cmd)
+        self._open = True
+        return touched
+
+    def _push(self, cmd):
+        self._undo.append(cmd)
+        self._cost += cmd.cost
+        if cmd.view_only:
+            self._views += 1
+            if self._views > self.limit:
+                self._undo.remove(next(c for c in self._undo if c.view_only))
+                self._views -= 1
+        while len(self._undo) - self._views > self.limit or (self._cost > self.point_budget and len(self._undo) > 1):
+            self._drop(self._undo.popleft())
+
+    def _drop(self, cmd):
+        self._cost -= cmd.cost
+        self._views -= cmd.view_only
+
+    def seal(self):
+        """Ends the current gesture: the next command starts a new undo step."""
+        self._open = False
+
+    def undo(self):
+        self._open = False
+        if not self._undo: return None
+        cmd = self._undo.pop()
+        self._drop(cmd)
+        self._redo.append(cmd)
+        return cmd.undo()
+
+    def redo(self):
+        self._open = False
+        if not self._redo: return None
+        cmd = self._redo.pop()
+        self._push(cmd)
+        return cmd.redo()
+
+    def clear(self):
+        self._undo.clear(); self._redo.clear()
+        self._cost = self._views = 0; self._open = False
+
+    def can_undo(self): return bool(self._undo)
+    def can_redo(self): return bool(self._redo)
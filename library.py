@@ -0,0 +1,246 @@
+# library.py
+# Component library, usable without the GUI (batch export workers load it too).
+# User parts live in LIBRARY_DIR as one JSON file per definition plus an append-only index:
+#   index.jsonl   ["add", key, comp_type, name, file, [pin labels]] / ["del", key]
+#   parts/<file>  ComponentDefinition.to_dict()
+# Startup reads only the index; definitions are parsed when first used and kept in an LRU cache.
+import bisect
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+from models import ComponentDefinition
+
+LIBRARY_DIR = "user_library"
+LEGACY_LIBRARY_FILE = "user_library.json"   # single-file library of older versions, imported once
+LIBRARY_CACHE_SIZE = 256
+
+def default_library():
+    dip8_pins = {**{(0,y):str(y+1) for y in range(4)}, **{(2,3-y):str(y+5) for y in range(4)}}
+    dip8_body = set([(0,y) for y in range(4)] + [(2,y) for y in range(4)])
+    return {
+        "DIP8 (IC)": ComponentDefinition("DIP8", 3, 4, dip8_pins, "IC", "#333", dip8_body),
+        "Resistor": ComponentDefinition("Resistor", 3, 1, {(0,0):"1", (2,0):"2"}, "R", "#D4AC0D"),
+        "Capacitor": ComponentDefinition("Cap", 2, 1, {(0,0):"+", (1,0):"-"}, "C", "#2980B9"),
+        "LED": ComponentDefinition("LED", 1, 1, {(0,0):"A"}, "D", "#C0392B"),
+    }
+
+def _dump(record): return json.dumps(record, separators=(",", ":"))
+
+def _pin_names(d): return sorted(set(map(str, d.pin_labels.values())))
+
+class LibraryStore:
+    """Dict-like library keyed by display name. Built-ins stay in memory; user parts load on demand."""
+    def __init__(self, path=LIBRARY_DIR, cache_size=LIBRARY_CACHE_SIZE):
+        self.path = path
+        self.cache_size = cache_size
+        self._builtins = default_library()
+        self._index = OrderedDict((k, (d.comp_type, d.name, None, _pin_names(d))) for k, d in self._builtins.items())
+        self._cache = OrderedDict()     # key -> ComponentDefinition, least recently used first
+        self._dead = 0                  # index lines that no longer describe a live part
+        self._load_index()
+
+    # --- Index ---
+    def _index_path(self): return os.path.join(self.path, "index.jsonl")
+
+    def _load_index(self):
+        path = self._index_path()
+        if not os.path.exists(path):
+            if os.path.exists(LEGACY_LIBRARY_FILE): self._import_legacy(LEGACY_LIBRARY_FILE)
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try: rec = json.loads(line)
+                except ValueError: continue
+                if rec[0] == "add":
+                    if rec[1] in self._index: self._dead += 1
+                    self._index[rec[1]] = (rec[2], rec[3], rec[4], rec[5] if len(rec) > 5 else [])
+                elif rec[0] == "del":
+                    self._dead += 2 if self._index.pop(rec[1], None) else 1
+                    if rec[1] in self._builtins: self._restore_builtin(rec[1])
+        if self._dead > max(64, len(self._index)): self._compact_index()
+
+    def _restore_builtin(self, key):
+        d = self._builtins[key]
+        self._index[key] = (d.comp_type, d.name, None, _pin_names(d))
+
+    def _compact_index(self):
+        tmp = self._index_path() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for key, (comp_type, name, file, pins) in self._index.items():
+                if file: f.write(_dump(["add", key, comp_type, name, file, pins]) + "\n")
+        os.replace(tmp, self._index_path())
+        self._dead = 0
+
+    def _append_index(self, rec):
+        with open(self._index_path(), "a", encoding="utf-8") as f: f.write(_dump(rec) + "\n")
+
+    def _import_legacy(self, path):
+        try:
+            with open(path, "r") as f: data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            return
+        # Old files repeated the built-ins; only genuinely user-made parts become records
+        builtin = [b.to_dict() for b in self._builtins.values()]
+        for d in data:
+            if d not in builtin: self.add(ComponentDefinition.from_dict(d))
+
+    # --- Mapping interface ---
+    def __len__(self): return len(self._index)
+    def __iter__(self): return iter(self._index)
+    def __contains__(self, key): return key in self._index
+    def keys(self): return self._index.keys()
+    def info(self, key):
+        """(comp_type, definition name) from the index, without loading the part."""
+        return self._index[key][:2]
+
+    def search_fields(self, key):
+        """Texts a part can be found by: key, definition name, type and pin labels (index only)."""
+        comp_type, name, _, pins = self._index[key]
+        return [key, name, comp_type] + list(pins)
+
+    def pin_names(self, key):
+        """Distinct pin labels of a part (index only)."""
+        return self._index[key][3]
+
+    def __getitem__(self, key):
+        if key in self._builtins and self._index[key][2] is None: return self._builtins[key]
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        file = self._index[key][2]
+        with open(os.path.join(self.path, "parts", file), "r", encoding="utf-8") as f:
+            d = ComponentDefinition.from_dict(json.load(f))
+        self._cache[key] = d
+        if len(self._cache) > self.cache_size: self._cache.popitem(last=False)
+        return d
+
+    def get(self, key, default=None):
+        try: return self[key]
+        except (KeyError, OSError, ValueError): return default
+
+    def values(self):
+        """Every definition; loads all of them, so prefer keys()/info() for listing."""
+        return (self[k] for k in list(self._index))
+
+    def items(self): return ((k, self[k]) for k in list(self._index))
+
+    def definitions_named(self, name):
+        return [self[k] for k, info in list(self._index.items()) if info[1] == name]
+
+    # --- Edits write one part file and one index line ---
+    def add(self, definition, key=None):
+        key = key or definition.name
+        file = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16] + ".json"
+        # Part file first, so the index never names a record that is not on disk yet
+        os.makedirs(os.path.join(self.path, "parts"), exist_ok=True)
+        tmp = os.path.join(self.path, "parts", file + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f: json.dump(definition.to_dict(), f)
+        os.replace(tmp, os.path.join(self.path, "parts", file))
+        pins = _pin_names(definition)
+        self._append_index(["add", key, definition.comp_type, definition.name, file, pins])
+        if key in self._index: self._dead += 1
+        self._index[key] = (definition.comp_type, definition.name, file, pins)
+        self._cache[key] = definition
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.cache_size: self._cache.popitem(last=False)
+        return key
+
+    def remove(self, key):
+        file = self._index.pop(key)[2]
+        self._cache.pop(key, None)
+        if file:
+            self._append_index(["del", key])
+            self._dead += 2
+            try: os.remove(os.path.join(self.path, "parts", file))
+            except OSError: pass
+        # Built-ins are only hidden for this session, as before
+
+    def __setitem__(self, key, definition): self.add(definition, key)
+    def __delitem__(self, key): self.remove(key)
+
+def load_library(path=LIBRARY_DIR): return LibraryStore(path)
+
+class PartIndex:
+    """Incremental search over a library's keys. Terms of 3+ characters match anywhere (trigram
+    candidates, then a substring check); shorter terms match the start of a word. All terms must match."""
+    def __init__(self, library):
+        self.library = library
+        self._keys = sorted(library.keys())     # every key, in listing order
+        self._text = {}         # key -> lowercased searchable text
+        self._grams = {}        # trigram -> keys containing it
+        self._words = []        # sorted (word, key) for prefix lookups
+        self._pending = list(self._keys)    # not indexed yet; see build_step
+
+    def _listed(self, key):
+        i = bisect.bisect_left(self._keys, key)
+        return i < len(self._keys) and self._keys[i] == key
+
+    def build_step(self, limit=None):
+        """Indexes up to limit pending keys (all if None), so a UI can spread the work over idle time. True when done."""
+        n = len(self._pending) if limit is None else min(limit, len(self._pending))
+        for _ in range(n):
+            key = self._pending.pop()
+            if key not in self._text and self._listed(key): self._index_key(key, sort=False)
+        if n and not self._pending: self._words.sort()
+        return not self._pending
+
+    def _index_key(self, key, sort=True):
+        text = "\n".join(self.library.search_fields(key)).lower()
+        self._text[key] = text
+        for i in range(len(text) - 2): self._grams.setdefault(text[i:i+3], set()).add(key)
+        for word in set(re.split(r"[^0-9a-z]+", text)):
+            if not word: continue
+            if sort: bisect.insort(self._words, (word, key))
+            else: self._words.append((word, key))
+
+    def add(self, key):
+        self.remove(key)    # re-adding an existing key replaces its entry
+        bisect.insort(self._keys, key)
+        if self._pending: self._pending.append(key)
+        else: self._index_key(key)
+
+    def remove(self, key):
+        if self._listed(key): del self._keys[bisect.bisect_left(self._keys, key)]
+        if key not in self._text: return
+        self.build_step()   # word list must be sorted to find the entries
+        text = self._text.pop(key)
+        for i in range(len(text) - 2):
+            keys = self._grams.get(text[i:i+3])
+            if keys is not None:
+                keys.discard(key)
+                if not keys: del self._grams[text[i:i+3]]
+        for word in set(re.split(r"[^0-9a-z]+", text)):
+            i = bisect.bisect_left(self._words, (word, key))
+            if i < len(self._words) and self._words[i] == (word, key): del self._words[i]
+
+    def matches(self, key, query):
+        """Whether key would be in search(query); checks just this one part."""
+        text = "\n".join(self.library.search_fields(key)).lower()
+        words = set(re.split(r"[^0-9a-z]+", text))
+        return all(t in text if len(t) >= 3 else any(w.startswith(t) for w in words) for t in query.lower().split())
+
+    def _term(self, term):
+        if len(term) >= 3:
+            sets = sorted((self._grams.get(term[i:i+3], set()) for i in range(len(term) - 2)), key=len)
+            found = set(sets[0]).intersection(*sets[1:])
+            return {k for k in found if term in self._text[k]} if len(term) > 3 else found
+        i = bisect.bisect_left(self._words, (term,))
+        found = set()
+        while i < len(self._words) and self._words[i][0].startswith(term):
+            found.add(self._words[i][1]); i += 1
+        return found
+
+    def search(self, query):
+        """Matching keys in sorted order; the full listing for an empty query."""
+        terms = query.lower().split()
+        if not terms: return list(self._keys)
+        self.build_step()
+        found = None
+        for term in sorted(terms, key=len, reverse=True):
+            found = self._term(term) if found is None else found & self._term(term)
+            if not found: return []
+        # Filtering the ordered list beats sorting when most parts match
+        return sorted(found) if len(found) * 8 < len(self._keys) else [k for k in self._keys if k in found]
@@ -1,23 +1,84 @@
+import sys
+
+def _cli_main(argv):
+    """Headless subcommands, dispatched before tkinter is imported so they run without Tk or a display."""
+    # python main.py export board.pcb --view back --out solder.svg
+    if argv[:1] == ["export"]:
+        from renderer import export_main
+        return export_main(argv[1:]) or 0
+    # Many boards, one worker pool: python main.py batch-export boards/ --out-dir sheets
+    if argv[:1] == ["batch-export"]:
+        from batch import batch_main
+        return batch_main(argv[1:]) or 0
+    return None
+
+if __name__ == "__main__":
+    _status = _cli_main(sys.argv[1:])
+    if _status is not None: sys.exit(_status)
+
 import tkinter as tk
-from tkinter import ttk, messagebox, colorchooser, simpledialog
-import json
+from tkinter import ttk, messagebox, colorchooser, simpledialog, filedialog
+import tkinter.font as tkfont
+import bisect
 import os
 import math
+import time
+from concurrent.futures import ThreadPoolExecutor
 from models import Board, ComponentDefinition, PlacedComponent, Wire
+from project import PROJECT_EXT, save_board, load_board
+from drc import DesignRuleChecker
+from autosave import Autosave, recover
+from profiler import Profiler
+from history import History, AddComponent, AddGroup, RemoveGroup, RemoveComponent, AddWire, RemoveWire, EditComponent, EditWire, EditGroup, SetImportedNets, Batch, PanView
+from router import RoutingGrid, route_many, make_wire
+from blocks import block_bounds, step_repeat
+import netlist
+import library as lib_store
+from renderer import SceneRenderer, COLOR_PCB_BOARD, COLOR_PAD, COLOR_PAD_HOLE
 
 # --- Config ---
+# Board colours live in renderer.py, shared with headless export
 COLOR_APP_BG = "#2E2E2E"
-COLOR_PCB_BOARD = "#2E7D32"
-COLOR_PCB_TEXT = "#A5D6A7"
 COLOR_GRID_LINE = "#388E3C"
-COLOR_PAD = "#1B5E20"
-COLOR_PAD_HOLE = "#000000"
 COLOR_WIRE_PREVIEW = "#FFEB3B"
 COLOR_SNAP = "#FF5252"
-COLOR_SELECT_HIGHLIGHT = "#00E5FF"
 COLOR_ERROR_GHOST = "#FF0000"
+COLOR_DRC = "#FF1744"
+COLOR_SELECT_BAND = "#FFFFFF"
+
+# Canvas layers, bottom to top. Every scene item carries the "scene" tag plus its layer tag.
+SCENE_LAYERS = ("board", "holes", "labels", "wires", "components", "drc", "overlay")
+ZOOM_SETTLE_MS = 150
+# Level of detail: below these cell sizes (px) the detail is unreadable anyway
+# (symbol and pin-text thresholds are in renderer.py)
+LOD_HOLE_PX = 10        # holes become one pre-rendered image instead of two ovals each
+CULL_MARGIN = 0.5   # items are built this fraction of a viewport past each edge, so short pans need no rebuild
+FRAME_BUDGET_MS = 16    # minimum time between two rendered frames; input in between is merged
+ROUTE_POLL_MS = 50      # how often the UI checks on a running autoroute
+AUTOSAVE_POLL_MS = 2000 # how often the UI checks the autosave writer for a failed write
+BULK_REDRAW_ITEMS = 300 # an edit or selection change touching more items rebuilds the scene once instead
+
+
+class FrameScheduler:
+    """Calls render at most once per frame. Any number of request() calls between frames collapse into one."""
+    def __init__(self, root, render, budget_ms=FRAME_BUDGET_MS):
+        self.root = root
+        self.render = render
+        self.budget_ms = budget_ms
+        self._job = None
+        self._last = 0.0
+
+    def request(self):
+        if self._job: return
+        wait = self.budget_ms - (time.perf_counter() - self._last) * 1000
+        # Render as soon as the event queue drains, unless the last frame was too recent
+        self._job = self.root.after(int(wait), self._run) if wait >= 1 else self.root.after_idle(self._run)
+
+    def _run(self):
+        self._job = None
+        self._last = time.perf_counter()
+        self.render()
 
-LIBRARY_FILE = "user_library.json"
 
 # --- Dialogs ---
 
@@ -29,6 +90,7 @@ class EditWireDialog(tk.Toplevel):
         self.geometry("300x250")
         self.wire = wire
         self.callback = callback
+        self.color = wire.color
         
         frame = ttk.Frame(self, padding=10)
         frame.pack(fill="both", expand=True)
@@ -51,15 +113,14 @@ class EditWireDialog(tk.Toplevel):
 
     def pick_color(self):
         # 修正縮排錯誤：變數 c 必須在函式內定義
-        c = colorchooser.askcolor(color=self.wire.color)[1]
+        c = colorchooser.askcolor(color=self.color)[1]
         if c: 
-            self.wire.color = c
+            self.color = c
             self.btn_color_preview.config(bg=c)
 
     def save(self):
-        self.wire.name = self.entry_name.get()
-        self.wire.side = self.combo_side.get()
-        self.callback()
+        # The wire itself is changed by the callback, so the edit lands in the undo log
+        self.callback(name=self.entry_name.get(), side=self.combo_side.get(), color=self.color)
         self.destroy()
 
 class EditComponentDialog(tk.Toplevel):
@@ -69,6 +130,7 @@ class EditComponentDialog(tk.Toplevel):
         self.geometry("300x450")
         self.component = component
         self.callback = callback
+        self.color = component.custom_color
         
         # Color
         frame_col = ttk.LabelFrame(self, text="Color")
@@ -94,18 +156,47 @@ class EditComponentDialog(tk.Toplevel):
         ttk.Button(self, text="Apply", command=self.save).pack(pady=10)
 
     def pick_color(self):
-        c = colorchooser.askcolor(color=self.component.custom_color)[1]
+        c = colorchooser.askcolor(color=self.color)[1]
         if c: 
-            self.component.custom_color = c
+            self.color = c
             self.btn_color.config(bg=c)
 
     def save(self):
-        self.component.value = self.entry_val.get()
-        self.component.custom_width = self.var_w.get()
-        self.component.custom_height = self.var_h.get()
-        self.callback()
+        if not self.callback(custom_color=self.color, value=self.entry_val.get(),
+                             custom_width=self.var_w.get(), custom_height=self.var_h.get()):
+            messagebox.showwarning("Blocked", "New size does not fit on the board.", parent=self)
+            return
         self.destroy()
 
+class StepRepeatDialog(tk.Toplevel):
+    """Columns, rows, pitch and rotation for copying the selected block."""
+    def __init__(self, parent, pitch, callback):
+        super().__init__(parent)
+        self.title("Step & Repeat")
+        self.geometry("300x260")
+        self.callback = callback
+
+        frame = ttk.Frame(self, padding=15)
+        frame.pack(fill="both", expand=True)
+        self.entries = {}
+        for row, (label, default) in enumerate((("Columns", 2), ("Rows", 1), ("Pitch X", pitch[0]), ("Pitch Y", pitch[1]))):
+            ttk.Label(frame, text=label).grid(row=row, column=0, pady=4, sticky="w")
+            entry = ttk.Entry(frame, width=8)
+            entry.insert(0, str(default))
+            entry.grid(row=row, column=1, pady=4)
+            self.entries[label] = entry
+        ttk.Label(frame, text="Rotation").grid(row=4, column=0, pady=4, sticky="w")
+        self.combo_rot = ttk.Combobox(frame, values=["0", "90", "180", "270"], state="readonly", width=6)
+        self.combo_rot.current(0)
+        self.combo_rot.grid(row=4, column=1, pady=4)
+        ttk.Button(frame, text="Repeat", command=self.apply).grid(row=5, column=0, columnspan=2, pady=15)
+
+    def apply(self):
+        try: cols, rows, px, py = (int(self.entries[k].get()) for k in ("Columns", "Rows", "Pitch X", "Pitch Y"))
+        except ValueError: return
+        if cols < 1 or rows < 1: return
+        if self.callback(cols, rows, px, py, int(self.combo_rot.get())): self.destroy()
+
 class StandardComponentWizard(tk.Toplevel):
     def __init__(self, parent, callback):
         super().__init__(parent)
@@ -250,14 +341,109 @@ class CustomShapeDrawer(tk.Toplevel):
         self.callback(comp)
         self.destroy()
 
-
-class PCBStudioApp:
+class LibraryBrowser(ttk.Frame):
+    """Searchable library list. Only the rows that fit are put in the Listbox; the scrollbar walks the result list."""
+    def __init__(self, parent, library, on_pick):
+        super().__init__(parent)
+        self.index = lib_store.PartIndex(library)
+        self.on_pick = on_pick
+        self.results = self.index.search("")   # sorted keys matching the query
+        self.top = 0                            # result shown in the first row
+        self.rows = 1
+        self.selected = None
+
+        self.var_query = tk.StringVar()
+        entry = ttk.Entry(self, textvariable=self.var_query)
+        entry.pack(fill="x", pady=(0, 5))
+        # Typing in the search box must not fire the single-key shortcuts bound on the main window
+        entry.bindtags((str(entry), "TEntry", "all"))
+        entry.bind("<Return>", lambda e: self.pick(0))
+        self.var_query.trace_add("write", lambda *a: self.filter())
+
+        self.lbl_count = ttk.Label(self)
+        self.lbl_count.pack(side=tk.BOTTOM, anchor="w")
+        self.scroll = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox = tk.Listbox(self, bg="#444", fg="white", selectbackground="#007ACC", activestyle="none", exportselection=False)
+        self.listbox.pack(side=tk.LEFT, fill="both", expand=True)
+        self.listbox.bind("<<ListboxSelect>>", self._on_select)
+        self.listbox.bind("<Configure>", self._on_resize)
+        self.listbox.bind("<MouseWheel>", lambda e: self.yview("scroll", -3 if e.delta > 0 else 3, "units") or "break")
+        self._line = tkfont.Font(font=self.listbox.cget("font")).metrics("linespace") + 2 * int(self.listbox.cget("selectborderwidth"))
+        self.render()
+        self.after_idle(self._build_index)
+
+    def _build_index(self):
+        # Trigram index fills in over idle time; a search before it finishes completes it on the spot
+        if not self.index.build_step(500): self.after(1, self._build_index)
+
+    def filter(self):
+        self.results = self.index.search(self.var_query.get())
+        self.top = 0
+        self.render()
+
+    def render(self):
+        n = len(self.results)
+        self.top = max(0, min(self.top, n - self.rows))
+        window = self.results[self.top:self.top + self.rows]
+        self.listbox.delete(0, tk.END)
+        if window: self.listbox.insert(tk.END, *window)
+        if self.selected in window: self.listbox.selection_set(window.index(self.selected))
+        self.scroll.set(*((self.top / n, (self.top + len(window)) / n) if n else (0, 1)))
+        self.lbl_count.config(text=f"{n} part{'s' if n != 1 else ''}")
+
+    def _on_resize(self, e):
+        pad = 2 * (int(self.listbox.cget("borderwidth")) + int(self.listbox.cget("highlightthickness")))
+        rows = max(1, (e.height - pad) // self._line)
+        if rows != self.rows: self.rows = rows; self.render()
+
+    def yview(self, *args):
+        if args[0] == "moveto": self.top = int(float(args[1]) * len(self.results))
+        elif args[0] == "scroll": self.top += int(args[1]) * (self.rows if args[2] == "pages" else 1)
+        self.render()
+
+    def _on_select(self, e):
+        idx = self.listbox.curselection()
+        if idx: self.pick(self.top + idx[0])
+
+    def pick(self, i):
+        if i >= len(self.results): return
+        self.selected = self.results[i]
+        self.render()
+        self.on_pick(self.selected)
+
+    def added(self, key):
+        """Updates the index and, if it matches the current query, the one affected result."""
+        self.index.add(key)
+        i = bisect.bisect_left(self.results, key)
+        if (i == len(self.results) or self.results[i] != key) and self.index.matches(key, self.var_query.get()):
+            self.results.insert(i, key)
+        self.render()
+
+    def removed(self, key):
+        self.index.remove(key)
+        i = bisect.bisect_left(self.results, key)
+        if i < len(self.results) and self.results[i] == key: del self.results[i]
+        if self.selected == key: self.selected = None
+        self.render()
+
+
+class PCBStudioApp(SceneRenderer):
     def __init__(self, root):
         self.root = root
         self.root.title("PCB Studio Pro - Ultimate")
         self.root.geometry("1400x900")
         
         self.board = Board(30, 20)
+        self.project_path = None
+        self.drc = DesignRuleChecker(self.board)
+        self.history = History()
+        self._drag = None           # (start cell, item, its x/y or points when the drag began)
+        self._router = None         # worker thread for autoroute, made on first use
+        self._route_job = None
+        self.show_drc = True
+        self._drc_tags = {}         # violation key -> canvas tag of its marker
+        self._drc_seq = 0
         self.cell_size = 30
         self.scale = 1.0
         self.offset_x = 80
@@ -268,42 +454,36 @@ class PCBStudioApp:
         self.place_rotation = 0
         self.current_wire_points = []
         
-        self.selected_comp_uid = None
-        self.selected_wire = None
+        self.selected_uids = set()
+        self.selected_wires = set()
+        self._band = None           # (start cell, current cell) of a rubber-band selection being dragged
+        self._net_wires = set()     # net of the selected wire, drawn highlighted
+        self._net_cells = set()
         
         self.hover_cell = (0,0)
         self.snap_cell = None 
         self.is_panning = False
+        self._zoom_job = None
+        # Looked up per frame, so the profiler can wrap _render_frame after the fact
+        self.frames = FrameScheduler(self.root, lambda: self._render_frame())
+        self._frame_dirty = set()   # "overlay", "view" (check coverage) or "full" (rebuild)
+        self._view_xform = (1.0, 0.0, 0.0)  # canvas transform not yet applied: x' = a*x + bx, y' = a*y + by
+        self._built_rect = None     # logical cell rect the retained scene currently covers
+        self._rebuilding = False    # redraw_all is building the scene in layer order
+        self._lod_images = []       # PhotoImages referenced by the canvas must outlive the items
+        self._overlay_items = None  # preview line / snap box, created once per scene build
+        self._ghost_key = None      # what the current ghost items were drawn for
+        self._ghost_cell = None
         
-        self.library = self._init_default_library()
-        self.load_user_library()
-        self.current_place_def = list(self.library.values())[0]
+        self.library = lib_store.load_library()
+        self.current_place_def = self.library[next(iter(self.library))]
 
         self._setup_ui()
+        self.profiler = Profiler(self)
         self._bind_events()
+        self.redraw_all()
         self.set_mode("SELECT")
-
-    def _init_default_library(self):
-        dip8_pins = {**{(0,y):str(y+1) for y in range(4)}, **{(2,3-y):str(y+5) for y in range(4)}}
-        dip8_body = set([(0,y) for y in range(4)] + [(2,y) for y in range(4)])
-        return {
-            "DIP8 (IC)": ComponentDefinition("DIP8", 3, 4, dip8_pins, "IC", "#333", dip8_body),
-            "Resistor": ComponentDefinition("Resistor", 3, 1, {(0,0):"1", (2,0):"2"}, "R", "#D4AC0D"),
-            "Capacitor": ComponentDefinition("Cap", 2, 1, {(0,0):"+", (1,0):"-"}, "C", "#2980B9"),
-            "LED": ComponentDefinition("LED", 1, 1, {(0,0):"A"}, "D", "#C0392B"),
-        }
-
-    def load_user_library(self):
-        if os.path.exists(LIBRARY_FILE):
-            try:
-                with open(LIBRARY_FILE, "r") as f:
-                    data = json.load(f)
-                    for d in data: self.library[d["name"]] = ComponentDefinition.from_dict(d)
-            except Exception as e: print(f"Error: {e}")
-
-    def save_user_library(self):
-        data = [c.to_dict() for c in self.library.values()]
-        with open(LIBRARY_FILE, "w") as f: json.dump(data, f, indent=2)
+        self._start_autosave()
 
     def _setup_ui(self):
         toolbar = ttk.Frame(self.root, relief="raised", padding=5)
@@ -314,6 +494,8 @@ class PCBStudioApp:
         ttk.Button(toolbar, text="Place (A)", command=lambda: self.set_mode("PLACE")).pack(side=tk.LEFT, padx=2)
         ttk.Button(toolbar, text="Wire (W)", command=lambda: self.set_mode("WIRE")).pack(side=tk.LEFT, padx=2)
         ttk.Button(toolbar, text="Eraser (X)", command=lambda: self.set_mode("DELETE")).pack(side=tk.LEFT, padx=2)
+        ttk.Button(toolbar, text="Route (T)", command=lambda: self.set_mode("ROUTE")).pack(side=tk.LEFT, padx=2)
+        ttk.Button(toolbar, text="Step & Repeat", command=self.open_step_repeat).pack(side=tk.LEFT, padx=2)
         
         ttk.Separator(toolbar, orient=tk.VERTICAL).pack(side=tk.LEFT, padx=10, fill=tk.Y)
         
@@ -323,8 +505,12 @@ class PCBStudioApp:
 
         # Tools Right
         ttk.Button(toolbar, text="Help (H)", command=self.show_help).pack(side=tk.RIGHT, padx=5)
-        ttk.Button(toolbar, text="Save Lib", command=self.save_user_library).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(toolbar, text="Save Board", command=self.save_project).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(toolbar, text="Open Board", command=self.open_project).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(toolbar, text="Import Netlist", command=self.import_netlist).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(toolbar, text="Route Nets", command=self.route_nets).pack(side=tk.RIGHT, padx=5)
         ttk.Button(toolbar, text="Flip View (V)", command=self.toggle_view).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(toolbar, text="DRC (D)", command=self.toggle_drc).pack(side=tk.RIGHT, padx=5)
 
         paned = ttk.PanedWindow(self.root, orient=tk.HORIZONTAL)
         paned.pack(fill=tk.BOTH, expand=True)
@@ -339,37 +525,127 @@ class PCBStudioApp:
 
         fr_lib = ttk.LabelFrame(frame_left, text="Library", padding=5)
         fr_lib.pack(fill="both", expand=True, pady=5)
-        self.listbox = tk.Listbox(fr_lib, bg="#444", fg="white", selectbackground="#007ACC")
-        self.listbox.pack(fill="both", expand=True)
-        self.listbox.bind("<<ListboxSelect>>", self.on_lib_select)
+        self.browser = LibraryBrowser(fr_lib, self.library, self.on_lib_pick)
+        self.browser.pack(fill="both", expand=True)
         ttk.Button(fr_lib, text="Delete", command=self.delete_comp).pack(fill="x")
-        self.refresh_listbox()
         
         self.canvas = tk.Canvas(paned, bg=COLOR_APP_BG)
         paned.add(self.canvas, weight=1)
 
     # ... Helpers ...
-    def refresh_listbox(self):
-        self.listbox.delete(0, tk.END)
-        for k in sorted(self.library.keys()): self.listbox.insert(tk.END, k)
-
     def delete_comp(self): 
-        idx = self.listbox.curselection()
-        if idx and messagebox.askyesno("Confirm", "Delete?"): 
-            del self.library[self.listbox.get(idx)]
-            self.refresh_listbox()
-            self.save_user_library()
+        key = self.browser.selected
+        if key and messagebox.askyesno("Confirm", "Delete?"): 
+            self.library.remove(key)
+            self.browser.removed(key)
 
     def open_wizard(self): StandardComponentWizard(self.root, self.add_lib)
     def open_drawer(self): CustomShapeDrawer(self.root, self.add_lib)
     def add_lib(self, c): 
-        self.library[c.name] = c
-        self.refresh_listbox()
-        self.save_user_library()
-
-    def on_lib_select(self, e):
-        idx = self.listbox.curselection()
-        if idx: self.current_place_def = self.library[self.listbox.get(idx)]; self.set_mode("PLACE")
+        self.browser.added(self.library.add(c))
+
+    def on_lib_pick(self, key): self.current_place_def = self.library[key]; self.set_mode("PLACE")
+
+    # --- Project Files ---
+    def save_project(self, save_as=False):
+        path = self.project_path
+        if save_as or not path:
+            path = filedialog.asksaveasfilename(defaultextension=PROJECT_EXT, filetypes=[("PCB Project", f"*{PROJECT_EXT}")])
+            if not path: return
+        try: save_board(self.board, path)
+        except OSError as e: 
+            messagebox.showerror("Save Failed", str(e))
+            return
+        self.project_path = path
+        self.root.title(f"PCB Studio Pro - {os.path.basename(path)}")
+
+    def open_project(self):
+        path = filedialog.askopenfilename(filetypes=[("PCB Project", f"*{PROJECT_EXT}"), ("All Files", "*.*")])
+        if not path: return
+        try: board = load_board(path, self.library)
+        except (OSError, ValueError) as e: 
+            messagebox.showerror("Open Failed", str(e))
+            return
+        self.set_board(board)
+        self.project_path = path
+        self.root.title(f"PCB Studio Pro - {os.path.basename(path)}")
+
+    def import_netlist(self):
+        """Places a KiCad / CSV netlist's parts in free space and keeps its nets on the board (one undo step),
+        then offers to route them. Nets left unrouted can be routed later with Route Nets."""
+        path = filedialog.askopenfilename(filetypes=[("Netlist", "*.net *.csv"), ("All Files", "*.*")])
+        if not path: return
+        try: result = netlist.import_netlist(self.board, path, self.library)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Import Failed", str(e))
+            return
+        if result.comps:
+            # Net names already on the board (a second import) gain the new members
+            nets = dict(self.board.imported_nets)
+            for name, members in result.nets.items(): nets[name] = tuple(dict.fromkeys(nets.get(name, ()) + members))
+            self.execute(Batch([AddGroup(self.board, result.comps, ()), SetImportedNets(self.board, nets)]))
+            self.select({c.uid for c in result.comps})
+        brief = lambda names: ", ".join(names[:12]) + (f" and {len(names) - 12} more" if len(names) > 12 else "")
+        notes = [f"{len(result.comps)} parts placed."]
+        if result.unmapped: notes.append(f"No library part for: {brief(sorted(result.unmapped))}")
+        if result.unplaced: notes.append(f"No room for: {brief(result.unplaced)}")
+        if result.missing_pins: notes.append(f"Unknown pins: {brief([f'{r}.{p}' for r, p in result.missing_pins])}")
+        pairs = netlist.connections(self.board, result.nets)
+        if not pairs:
+            messagebox.showinfo("Import Netlist", "\n".join(notes))
+            return
+        notes.append(f"\nRoute {len(pairs)} connections of {len(result.nets)} nets now? (Route Nets does it later.)")
+        if messagebox.askyesno("Import Netlist", "\n".join(notes)): self._route_pairs(pairs)
+
+    def route_nets(self):
+        """Autoroutes the board's netlist connections that no wire joins yet."""
+        if not self.board.imported_nets:
+            messagebox.showinfo("Route Nets", "This board has no netlist. Use Import Netlist first.")
+            return
+        pairs = netlist.connections(self.board, self.board.imported_nets)
+        if not pairs: messagebox.showinfo("Route Nets", "Every net is already connected.")
+        else: self._route_pairs(pairs)
+
+    def _route_pairs(self, pairs):
+        if not self.autoroute([(a, b) for a, b, _ in pairs], [name for _, _, name in pairs]):
+            messagebox.showwarning("Autoroute", "The autorouter is still busy. Use Route Nets when it is done.")
+
+    def _start_autosave(self):
+        # Journal files left behind mean the last session did not exit cleanly
+        try: board = recover(library=self.library)
+        except (OSError, ValueError) as e:
+            board = None
+            messagebox.showwarning("Recover", f"The last session's autosave could not be read.\n{e}")
+        self.autosave = Autosave()
+        if board and messagebox.askyesno("Recover", "The last session ended unexpectedly.\nRecover its unsaved board?"):
+            self.set_board(board)
+        else: self.autosave.reset(self.board)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(AUTOSAVE_POLL_MS, self._poll_autosave, None)
+
+    def _poll_autosave(self, reported):
+        # The writer keeps retrying on its own; each new failure is shown once, recovery only in the status bar
+        error = self.autosave.error
+        if error is not None and reported is None:
+            messagebox.showwarning("Autosave", f"Autosave could not write its files; unsaved work is at risk until it can.\n{error}")
+        elif error is None and reported is not None: self.lbl_status.config(text="Autosave is writing again.")
+        self.root.after(AUTOSAVE_POLL_MS, self._poll_autosave, error)
+
+    def on_close(self):
+        if self._router: self._router.shutdown(wait=False, cancel_futures=True)
+        self.autosave.close()
+        self.root.destroy()
+
+    def set_board(self, board):
+        self.board = board
+        self.selected_uids = set(); self.selected_wires = set()
+        self._net_wires = set(); self._net_cells = set()
+        self.drc = DesignRuleChecker(board)
+        self.drc.run_all()
+        self.history.clear()
+        self.autosave.reset(board)
+        self.current_wire_points = []
+        self.redraw_all()
 
     # --- Mode & Help ---
     def set_mode(self, m): 
@@ -381,9 +657,10 @@ class PCBStudioApp:
         if m == "PLACE": cursor = "tcross"
         elif m == "WIRE": cursor = "plus"
         elif m == "DELETE": cursor = "X_cursor"
+        elif m == "ROUTE": cursor = "crosshair"
         
         self.canvas.config(cursor=cursor)
-        self.redraw_all()
+        self.redraw_overlay()
 
     def show_help(self):
         msg = """
@@ -391,14 +668,24 @@ class PCBStudioApp:
         
         Modes:
         - Select (Esc): Click to select components/wires. Double-click to edit. Drag to move.
+          Drag on empty board for a selection box; Shift+Click / Shift+Drag adds to the selection.
         - Place (A): Place components from library. 'R' to Rotate.
         - Wire (W): Draw connections. Click pin/grid to start. Esc to finish wire.
         - Eraser (X): Click component or wire to delete.
+        - Route (T): Click two pins; a wire is routed between them around parts and wires on this side.
 
         Shortcuts:
         - V: Flip View (Front/Back)
-        - R: Rotate Component (90deg)
-        - Delete: Remove selected item
+        - D: Show/Hide Design Rule Check markers
+        - P: Show/Hide the frame-time profiler; Ctrl+T: Export its trace
+        - Ctrl+S / Ctrl+O: Save / Open Board
+        - Import Netlist: Place a KiCad .net / CSV netlist's parts, then route its nets
+        - Route Nets: Autoroute the imported nets' connections that are still open
+        - R: Rotate Component (90deg), or the selection in Select mode
+        - C: Recolor the selection; Ctrl+A: Select all
+        - Ctrl+R: Step & Repeat the selection (N x M copies with pitch and rotation)
+        - Delete: Remove selected items
+        - Ctrl+Z / Ctrl+Y: Undo / Redo
         - Scroll: Zoom In/Out
         - Right Click Drag: Pan View
         """
@@ -413,14 +700,18 @@ class PCBStudioApp:
 
     def on_move(self, event):
         lx, ly = self.screen_to_logic(event.x, event.y)
+        if (lx, ly) == self.hover_cell: return
         self.hover_cell = (lx, ly)
         self.snap_cell = None
         if self.mode == "WIRE":
             comp, pin = self.board.get_pin_obj_at(lx, ly)
             if pin: self.snap_cell = (lx, ly)
             else: self.snap_cell = (lx, ly) # Grid Center Snap
+        elif self.mode == "ROUTE":
+            comp, pin = self.board.get_pin_obj_at(lx, ly)
+            if pin: self.snap_cell = (lx, ly)
         
-        if self.mode in ["PLACE", "WIRE"]: self.redraw_all()
+        if self.mode in ["PLACE", "WIRE", "ROUTE"]: self.request_frame("overlay")
 
     def on_click(self, event):
         lx, ly = self.screen_to_logic(event.x, event.y)
@@ -438,227 +729,491 @@ class PCBStudioApp:
             if len(self.current_wire_points) > 1 and self.current_wire_points[-1] == self.current_wire_points[-2]: 
                 self.finish_wire()
             else: 
-                self.redraw_all()
+                self.redraw_overlay()
 
         elif self.mode == "PLACE":
-            # Ghost Check (Strict)
-            valid = True
-            test = PlacedComponent(self.current_place_def, lx, ly, "t", self.place_rotation)
-            if test.x < 0 or test.y < 0: valid = False
-            elif test.x + test.width > self.board.width or test.y + test.height > self.board.height: valid = False
-            
-            if valid:
-                self.board.add_component_instance(PlacedComponent(self.current_place_def, lx, ly, f"u{len(self.board.components)}", self.place_rotation))
-                self.redraw_all()
+            # Bounds and overlap are checked by the board's occupancy grid, which also gives the part its uid
+            comp = PlacedComponent(self.current_place_def, lx, ly, None, self.place_rotation)
+            self.execute(AddComponent(self.board, comp))
         
+        elif self.mode == "ROUTE":
+            # First pin is held as a one-point preview; the second starts the route
+            if not self.board.get_pin_obj_at(lx, ly)[1]: return
+            if not self.current_wire_points: self.current_wire_points = [(lx, ly)]
+            else:
+                start = self.current_wire_points[0]
+                self.current_wire_points = []
+                if start != (lx, ly): self.autoroute([(start, (lx, ly))])
+            self.redraw_overlay()
+
         elif self.mode == "DELETE":
             c = self.board.get_component_at(lx, ly)
-            if c: self.board.remove_component(c.uid)
+            if c: self.execute(RemoveComponent(self.board, c))
             else:
                 w = self.board.get_wire_at(lx, ly)
-                if w: self.board.remove_wire(w)
-            self.redraw_all()
+                if w: self.execute(RemoveWire(self.board, w))
             
         elif self.mode == "SELECT":
+            shift = event.state & 0x0001
             c = self.board.get_component_at(lx, ly)
-            if c: 
-                self.selected_comp_uid = c.uid; self.selected_wire = None
-            else:
-                w = self.board.get_wire_at(lx, ly)
-                if w: self.selected_wire = w; self.selected_comp_uid = None
-                else: self.selected_wire = None; self.selected_comp_uid = None
-            self.redraw_all()
+            w = None if c else self.board.get_wire_at(lx, ly)
+            uids, wires = ([c.uid] if c else []), ([w] if w else [])
+            if shift:
+                # Shift toggles the item under the cursor, or adds a rubber band's worth to the selection
+                if c or w: self.select(uids, wires, toggle=True)
+                else: self._band = ((lx, ly), (lx, ly))
+                return
+            if not c and not w:
+                self.select()
+                self._band = ((lx, ly), (lx, ly))
+                return
+            # Grabbing a selected item moves the whole selection
+            if not (c and c.uid in self.selected_uids) and not (w and w in self.selected_wires): self.select(uids, wires)
+            comps = [self.board.get_component(uid) for uid in self.selected_uids]
+            self._drag = [(lx, ly), (0, 0), {comp: (comp.x, comp.y) for comp in comps}, {wire: list(wire.points) for wire in self.selected_wires}]
+
+    def on_drag(self, event):
+        """Moves the selection grabbed in SELECT mode, or stretches the rubber band. A drag is one undo step."""
+        if self.mode != "SELECT": return
+        lx, ly = self.screen_to_logic(event.x, event.y)
+        if self._band:
+            if self._band[1] != (lx, ly): self._band = (self._band[0], (lx, ly)); self.request_frame("overlay")
+            return
+        if not self._drag: return
+        (sx, sy), moved, comps, wires = self._drag
+        dx, dy = lx - sx, ly - sy
+        if (dx, dy) == moved: return
+        # Offsets are from where the drag began, so a refused step (blocked) is simply retried on the next motion
+        wires = {w: [(x + dx, y + dy) for x, y in pts] for w, pts in wires.items()}
+        if not all(map(self.board.points_fit, wires.values())): return
+        if self.execute(EditGroup(self.board, {c: {"x": x + dx, "y": y + dy} for c, (x, y) in comps.items()},
+                                  {w: {"points": pts} for w, pts in wires.items()}, "drag")):
+            self._drag[1] = (dx, dy)
+
+    def end_drag(self, event):
+        self._drag = None
+        self.history.seal()
+        if self._band:
+            (x1, y1), (x2, y2) = self._band
+            self._band = None
+            comps, wires = self.board.items_in_rect(min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+            add = event is not None and event.state & 0x0001
+            self.select([c.uid for c in comps], wires, add=add)
+            self.redraw_overlay()
 
     def on_double_click(self, event):
         if self.mode == "WIRE": 
             self.finish_wire()
         elif self.mode == "SELECT":
             if self.selected_comp_uid:
-                comp = next((c for c in self.board.components if c.uid == self.selected_comp_uid), None)
-                if comp: EditComponentDialog(self.root, comp, self.redraw_all)
+                comp = self.board.get_component(self.selected_comp_uid)
+                if comp: EditComponentDialog(self.root, comp, lambda **ch: self.execute(EditComponent(self.board, comp, **ch)))
             elif self.selected_wire:
-                EditWireDialog(self.root, self.selected_wire, self.redraw_all)
+                wire = self.selected_wire
+                EditWireDialog(self.root, wire, lambda **ch: self.execute(EditWire(self.board, wire, **ch)))
 
     def on_key_delete(self, event):
-        if self.selected_comp_uid: 
-            self.board.remove_component(self.selected_comp_uid)
-            self.selected_comp_uid = None
-        elif self.selected_wire: 
-            self.board.remove_wire(self.selected_wire)
-            self.selected_wire = None
-        self.redraw_all()
+        comps = [c for c in map(self.board.get_component, self.selected_uids) if c]
+        wires = list(self.selected_wires)
+        self.selected_uids = set(); self.selected_wires = set()
+        if comps or wires: self.execute(RemoveGroup(self.board, comps, wires))
+
+    def rotate_selection(self):
+        """Turns the selection 90 degrees clockwise about the middle of its bounding box, as one step."""
+        comps = [self.board.get_component(uid) for uid in self.selected_uids]
+        cells = [(x, y) for c in comps for x, y in ((c.x, c.y), (c.x + c.width - 1, c.y + c.height - 1))]
+        cells += [p for w in self.selected_wires for p in w.points]
+        if not cells: return
+        xs, ys = [x for x, _ in cells], [y for _, y in cells]
+        cx, cy = (min(xs) + max(xs)) // 2, (min(ys) + max(ys)) // 2
+        # Clockwise on screen (y down): (x, y) -> (cx + cy - y, cy - cx + x); a part's top-left comes from its bottom-left
+        wires = {w: [(cx + cy - y, cy - cx + x) for x, y in w.points] for w in self.selected_wires}
+        ok = all(map(self.board.points_fit, wires.values())) and self.execute(EditGroup(self.board,
+            {c: {"x": cx + cy - (c.y + c.height - 1), "y": cy - cx + c.x, "rotation": (c.rotation + 90) % 360} for c in comps},
+            {w: {"points": pts} for w, pts in wires.items()}))
+        if not ok: messagebox.showwarning("Blocked", "The rotated selection does not fit on the board.")
+
+    def recolor_selection(self):
+        if not self.selected_uids and not self.selected_wires: return
+        color = colorchooser.askcolor()[1]
+        if not color: return
+        self.execute(EditGroup(self.board, {self.board.get_component(uid): {"custom_color": color} for uid in self.selected_uids},
+                               {w: {"color": color} for w in self.selected_wires}))
+
+    def _selected_block(self):
+        # In draw order, so copies stack the way the original does
+        comps = self.board.components_in_order(self.selected_uids)
+        return comps, [w for w in self.board.wires if w in self.selected_wires]
+
+    def open_step_repeat(self):
+        bounds = block_bounds(*self._selected_block())
+        if bounds is None:
+            messagebox.showinfo("Step & Repeat", "Select the block to repeat first (drag a box around it in Select mode).")
+            return
+        x1, y1, x2, y2 = bounds
+        StepRepeatDialog(self.root, (x2 - x1 + 2, y2 - y1 + 2), self.repeat_selection)
+
+    def repeat_selection(self, cols, rows, pitch_x, pitch_y, rotation=0):
+        """Adds cols x rows - 1 copies of the selected block as one step. Nothing is placed unless every copy fits."""
+        comps, wires = self._selected_block()
+        new_comps, new_wires = step_repeat(comps, wires, cols, rows, pitch_x, pitch_y, rotation)
+        bad = self.board.misfits(new_comps)
+        off = sum(1 for w in new_wires if not self.board.points_fit(w.points))
+        if bad or off:
+            messagebox.showwarning("Step & Repeat", f"{len(bad)} of {len(new_comps)} copied parts and {off} wires would leave the board or overlap others.\nNothing was placed.")
+            return False
+        if not self.execute(AddGroup(self.board, new_comps, new_wires)): return False
+        self.select([c.uid for c in new_comps], new_wires, add=True)
+        return True
+
+    def select_all(self):
+        if self.mode == "SELECT": self.select([c.uid for c in self.board.components], self.board.wires)
 
     def finish_wire(self):
         if len(self.current_wire_points) > 1 and self.current_wire_points[-1] == self.current_wire_points[-2]:
             self.current_wire_points.pop()
         
         if len(self.current_wire_points) >= 2:
-            name = f"N{len(self.board.wires)}"
+            # Extending an existing net keeps its name; joining two named nets is left for DRC to flag
+            names = [w.name for p in self.current_wire_points for w in self.board.wires_at(*p)]
+            name = names[0] if names else f"N{len(self.board.wires)}"
             side = "back" if self.is_back_view else "front"
             def_col = "#2980B9" if side == "back" else "#C0392B"
-            self.board.add_wire(Wire(self.current_wire_points, name, def_col, side))
+            self.execute(AddWire(self.board, Wire(self.current_wire_points, name, def_col, side)))
         
         self.current_wire_points = []
         self.set_mode("SELECT" if self.mode != "WIRE" else "WIRE")
 
+    # --- Scene (retained canvas items) ---
+    def _put_in_layer(self, layer, tag_or_id):
+        # New items land on top of the display list; slide them under the layer's marker.
+        # A full rebuild draws the layers bottom up and caps each with its marker, so nothing needs to move.
+        if not self._rebuilding: self.canvas.tag_lower(tag_or_id, f"mark_{layer}")
+
     def redraw_all(self):
+        """Full rebuild of the scene. Only needed on view flips, board changes and after a zoom settles."""
         self.canvas.delete("all")
+        self._overlay_items = None; self._ghost_key = None; self._lod_images = []
+        self._view_xform = (1.0, 0.0, 0.0); self._frame_dirty.discard("full")
         sz = self.cell_size * self.scale
-        cols, rows = self.board.width, self.board.height
-        bx1 = self.offset_x; by1 = self.offset_y
-        bx2 = self.offset_x + cols * sz; by2 = self.offset_y + rows * sz
-        margin = sz * 1.0
-        
-        # PCB
-        self.canvas.create_rectangle(bx1-margin, by1-margin, bx2+margin, by2+margin, fill=COLOR_PCB_BOARD, outline="black", width=3)
-        
-        # Labels
-        for c in range(cols):
-            cx, cy = self.logic_to_screen(c, 0); cx += sz/2
-            idx = (cols - 1 - c) if self.is_back_view else c
-            char = chr(ord('A') + (idx % 26))
-            self.canvas.create_text(cx, by1 - margin/2, text=char, fill=COLOR_PCB_TEXT, font=("Arial", 10, "bold"))
-            self.canvas.create_text(cx, by2 + margin/2, text=char, fill=COLOR_PCB_TEXT, font=("Arial", 10, "bold"))
-        for r in range(rows):
-            cy = self.offset_y + r * sz + sz/2
-            self.canvas.create_text(bx1 - margin/2, cy, text=str(r+1), fill=COLOR_PCB_TEXT, font=("Arial", 10, "bold"))
-            self.canvas.create_text(bx2 + margin/2, cy, text=str(r+1), fill=COLOR_PCB_TEXT, font=("Arial", 10, "bold"))
-
-        # Holes
-        for r in range(rows):
-            for c in range(cols):
-                x, y = self.logic_to_screen(c, r)
-                self.canvas.create_oval(x+2, y+2, x+sz-2, y+sz-2, fill=COLOR_PAD, outline="")
-                self.canvas.create_oval(x+sz/2-2, y+sz/2-2, x+sz/2+2, y+sz/2+2, fill=COLOR_PAD_HOLE)
-
-        # Wires
-        for wire in self.board.wires:
-            pts = [self.logic_to_screen(p[0], p[1]) for p in wire.points]
-            flat = []
-            for px, py in pts: flat.extend([px+sz/2, py+sz/2])
-            
-            if len(flat) >= 4:
-                active = (self.is_back_view and wire.side == "back") or (not self.is_back_view and wire.side == "front")
-                w_thick = 5 if active else 2 
-                lc = COLOR_SELECT_HIGHLIGHT if wire == self.selected_wire else wire.color
-                if wire == self.selected_wire: w_thick += 2
-                
-                self.canvas.create_line(flat, fill=lc, width=w_thick, capstyle="round", joinstyle="round")
-                
-                # Terminals
-                r_term = w_thick * 0.8
-                self.canvas.create_oval(flat[0]-r_term, flat[1]-r_term, flat[0]+r_term, flat[1]+r_term, fill=lc, outline="black")
-                self.canvas.create_oval(flat[-2]-r_term, flat[-1]-r_term, flat[-2]+r_term, flat[-1]+r_term, fill=lc, outline="black")
+        
+        # Only the viewport (plus margin) is built; see _view_covered
+        rect = self._built_rect = self._visible_rect(CULL_MARGIN)
+        self._drc_tags = {}; self.drc.take_changes()
+        cap = lambda layer: self.canvas.create_line(0, 0, 0, 0, state="hidden", tags=("scene", f"mark_{layer}"))
+        self._rebuilding = True     # layers in SCENE_LAYERS order, each capped by its marker
+        try:
+            self._draw_board_layer(sz); cap("board")
+            self._draw_holes_layer(sz, rect); cap("holes")
+            self._draw_labels_layer(sz, rect); cap("labels")
+            self._draw_wires_layer(sz, rect); cap("wires")
+            self._draw_components_layer(sz, rect); cap("components")
+            if self.show_drc: self._draw_drc_layer(sz)
+            cap("drc")
+            self.redraw_overlay(); cap("overlay")
+        finally: self._rebuilding = False
+
+        self._draw_banner()
+        self.canvas.create_text(20, 45, text="", fill=COLOR_DRC, anchor="w", font=("Arial", 10, "bold"), tags=("hud", "drc_hud"))
+        self._update_drc_hud()
+
+    def _draw_wires_layer(self, sz, rect):
+        for wire in self.board.wires_in_rect(*rect): self._draw_wire(wire, sz)
+
+    def _draw_components_layer(self, sz, rect):
+        for comp in self.board.components_in_rect(*rect): self._draw_component(comp, sz)
+
+    def _draw_drc_layer(self, sz):
+        for key in self.drc.violations: self._draw_violation(key, sz)
+
+    def _visible_rect(self, margin=0.0):
+        """Logical cells (x1, y1, x2, y2, inclusive) under the canvas, grown by margin viewports, clipped to the board."""
+        sz = self.cell_size * self.scale
+        cw, ch = self.canvas.winfo_width(), self.canvas.winfo_height()
+        if cw <= 1 or ch <= 1: return 0, 0, self.board.width - 1, self.board.height - 1 # Not mapped yet
+        mx, my = cw * margin, ch * margin
+        x1 = math.floor((-mx - self.offset_x) / sz); x2 = math.floor((cw + mx - self.offset_x) / sz)
+        y1 = math.floor((-my - self.offset_y) / sz); y2 = math.floor((ch + my - self.offset_y) / sz)
+        if self.is_back_view: x1, x2 = self.board.width - 1 - x2, self.board.width - 1 - x1
+        return max(0, x1), max(0, y1), min(self.board.width - 1, x2), min(self.board.height - 1, y2)
+
+    def _view_covered(self):
+        vx1, vy1, vx2, vy2 = self._visible_rect()
+        if vx1 > vx2 or vy1 > vy2: return True # Board is off screen
+        if not self._built_rect: return False
+        bx1, by1, bx2, by2 = self._built_rect
+        return bx1 <= vx1 and by1 <= vy1 and vx2 <= bx2 and vy2 <= by2
+
+    def _draw_holes_layer(self, sz, rect):
+        if sz < LOD_HOLE_PX:
+            self._draw_holes_image(sz, rect, self._scene_tags("holes"))
+            self._put_in_layer("holes", "holes")
+            return
+        super()._draw_holes_layer(sz, rect)
+
+    def _draw_holes_image(self, sz, rect, tags):
+        """Low zoom: the whole hole pattern as a single image item."""
+        x1, y1, x2, y2 = rect
+        if x1 > x2 or y1 > y2: return
+        cols, rows = x2 - x1 + 1, y2 - y1 + 1
+        w_px, h_px = int(math.ceil(cols * sz)), int(math.ceil(rows * sz))
+        band_h = int(math.ceil(sz))
+        
+        # One row of cells rendered pixel by pixel, positioned from the float cell size so nothing drifts
+        r_pad, r_hole = max(sz/2 - 2, 0), min(2, sz/4)
+        band = []
+        for py in range(band_h):
+            dy = py + 0.5 - sz/2
+            line = []
+            for px in range(w_px):
+                dx = (px + 0.5) % sz - sz/2
+                d2 = dx*dx + dy*dy
+                line.append(COLOR_PAD_HOLE if d2 <= r_hole*r_hole else COLOR_PAD if d2 <= r_pad*r_pad else COLOR_PCB_BOARD)
+            band.append("{" + " ".join(line) + "}")
+        band_img = tk.PhotoImage(width=w_px, height=band_h)
+        band_img.put(" ".join(band))
+        
+        img = tk.PhotoImage(width=w_px, height=h_px)
+        for r in range(rows): img.tk.call(img, "copy", band_img, "-to", 0, int(round(r * sz)))
+        self._lod_images.append(img)
+        
+        left = min(self.logic_to_screen(x1, y1)[0], self.logic_to_screen(x2, y1)[0])
+        self.canvas.create_image(left, self.offset_y + y1 * sz, image=img, anchor="nw", tags=tags)
+
+    def redraw_overlay(self):
+        """Updates the transient items (wire preview, snap box, placement ghost) in place."""
+        self._apply_view()
+        sz = self.cell_size * self.scale
+        if self._overlay_items is None:
+            tags = self._scene_tags("overlay")
+            self._overlay_items = {
+                "preview": self.canvas.create_line(0, 0, 0, 0, fill=COLOR_WIRE_PREVIEW, width=3, dash=(4,2), state="hidden", tags=tags),
+                "snap": self.canvas.create_rectangle(0, 0, 0, 0, outline=COLOR_SNAP, width=3, state="hidden", tags=tags),
+                "band": self.canvas.create_rectangle(0, 0, 0, 0, outline=COLOR_SELECT_BAND, dash=(4, 2), state="hidden", tags=tags),
+            }
+            self._put_in_layer("overlay", "overlay")
+        preview, snap = self._overlay_items["preview"], self._overlay_items["snap"]
 
         # Wire Preview
-        if self.mode == "WIRE" and self.current_wire_points:
-            pts = [self.logic_to_screen(p[0], p[1]) for p in self.current_wire_points]
-            flat = []
-            for px, py in pts: flat.extend([px+sz/2, py+sz/2])
+        flat = []
+        if self.mode in ("WIRE", "ROUTE") and self.current_wire_points:
+            for p in self.current_wire_points:
+                px, py = self.logic_to_screen(p[0], p[1]); flat.extend([px+sz/2, py+sz/2])
             target = self.snap_cell if self.snap_cell else self.hover_cell
             cx, cy = self.logic_to_screen(*target)
             flat.extend([cx+sz/2, cy+sz/2])
-            if len(flat) >= 4: self.canvas.create_line(flat, fill=COLOR_WIRE_PREVIEW, width=3, dash=(4,2))
+        if len(flat) >= 4:
+            self.canvas.coords(preview, *flat); self.canvas.itemconfig(preview, state="normal")
+        else: self.canvas.itemconfig(preview, state="hidden")
 
         # Snap
-        if self.mode == "WIRE" and self.snap_cell:
+        if self.mode in ("WIRE", "ROUTE") and self.snap_cell:
             sx, sy = self.logic_to_screen(*self.snap_cell)
-            self.canvas.create_rectangle(sx-2, sy-2, sx+sz+2, sy+sz+2, outline=COLOR_SNAP, width=3)
+            self.canvas.coords(snap, sx-2, sy-2, sx+sz+2, sy+sz+2); self.canvas.itemconfig(snap, state="normal")
+        else: self.canvas.itemconfig(snap, state="hidden")
+
+        # Rubber band, around whole cells like the selection it will make
+        band = self._overlay_items["band"]
+        if self._band:
+            (x1, y1), (x2, y2) = self._band
+            ax, ay = self.logic_to_screen(min(x1, x2), min(y1, y2)); bx, by = self.logic_to_screen(max(x1, x2), max(y1, y2))
+            self.canvas.coords(band, min(ax, bx), ay, max(ax, bx) + sz, by + sz); self.canvas.itemconfig(band, state="normal")
+        else: self.canvas.itemconfig(band, state="hidden")
 
-        # Components
-        for comp in self.board.components: self._draw_component(comp, sz)
-        
         # Ghost
-        if self.mode == "PLACE":
-            test = PlacedComponent(self.current_place_def, self.hover_cell[0], self.hover_cell[1], "t", self.place_rotation)
-            valid = True
-            if test.x < 0 or test.y < 0: valid = False
-            elif test.x + test.width > self.board.width or test.y + test.height > self.board.height: valid = False
-            
+        if self.mode == "PLACE": self._update_ghost(sz)
+        elif self._ghost_key: self.canvas.delete("ghost"); self._ghost_key = None
+
+    def _update_ghost(self, sz):
+        hx, hy = self.hover_cell
+        test = PlacedComponent(self.current_place_def, hx, hy, "t", self.place_rotation)
+        valid = self.board.can_place(test)
+
+        key = (self.current_place_def, self.place_rotation, valid, self.is_back_view, sz)
+        if key == self._ghost_key:
+            # Same shape, new cell: translate the existing items
+            ox, oy = self.logic_to_screen(*self._ghost_cell)
+            nx, ny = self.logic_to_screen(hx, hy)
+            self.canvas.move("ghost", nx - ox, ny - oy)
+        else:
+            self.canvas.delete("ghost")
             ghost_color = None if valid else COLOR_ERROR_GHOST
             self._draw_component(test, sz, is_ghost=True, ghost_override_color=ghost_color)
-
-        txt = "BACK (SOLDER)" if self.is_back_view else "FRONT (COMPONENT)"
-        self.canvas.create_text(20, 20, text=txt, fill="white", anchor="w", font=("Arial", 14, "bold"))
-
-    def _draw_component(self, comp, sz, is_ghost=False, ghost_override_color=None):
-        tags = ("comp", comp.uid)
-        color = comp.custom_color
-        is_transparent = comp.definition.comp_type in ["R", "C", "D"]
-        draw_fill = (not self.is_back_view) and (not is_transparent) and (not is_ghost)
-        draw_outline = self.is_back_view or is_ghost
-        min_x, min_y, max_x, max_y = 9999, 9999, -9999, -9999
-        
-        for bx, by in comp.definition.body_cells:
-            w, h = comp.definition.width, comp.definition.height
-            rx, ry = bx, by
-            if comp.rotation == 90: rx, ry = h-1-ry, rx
-            elif comp.rotation == 180: rx, ry = w-1-rx, h-1-ry
-            elif comp.rotation == 270: rx, ry = ry, w-1-rx
-            abs_x, abs_y = comp.x + rx, comp.y + ry
-            sx, sy = self.logic_to_screen(abs_x, abs_y)
-            min_x = min(min_x, sx); min_y = min(min_y, sy)
-            max_x = max(max_x, sx+sz); max_y = max(max_y, sy+sz)
-
-            if draw_fill: self.canvas.create_rectangle(sx, sy, sx+sz, sy+sz, fill=color, outline="", tags=tags)
-            elif draw_outline: 
-                oc = ghost_override_color if ghost_override_color else "white"
-                self.canvas.create_rectangle(sx+2, sy+2, sx+sz-2, sy+sz-2, outline=oc, dash=(2,2), tags=tags)
-            
-            if self.selected_comp_uid == comp.uid: self.canvas.create_rectangle(sx-1, sy-1, sx+sz+1, sy+sz+1, outline=COLOR_SELECT_HIGHLIGHT, width=2)
-            
-            if not (is_ghost and ghost_override_color):
-                pin = comp.get_pin_at(abs_x, abs_y)
-                if pin:
-                    pc = "#FFC107" if self.is_back_view else "#B0BEC5"
-                    pm = sz*0.3
-                    self.canvas.create_oval(sx+pm, sy+pm, sx+sz-pm, sy+sz-pm, fill=pc, outline="black")
-                    if self.is_back_view: self.canvas.create_text(sx+sz/2, sy+sz/2, text=pin, font=("Arial", 8))
-
-        if not is_ghost and not self.is_back_view:
-            cx, cy = (min_x+max_x)/2, (min_y+max_y)/2
-            w_px = max_x - min_x; h_px = max_y - min_y
-            c_type = comp.definition.comp_type
-            if c_type == "R":
-                line_w = max(3, sz * 0.15); margin = sz * 0.2
-                if w_px > h_px:
-                    l = w_px - 2*margin; step = l/6; pts = [(min_x+margin, cy)]
-                    for i in range(1, 6): pts.append((min_x+margin + i*step, cy + ((sz*0.4) if i%2!=0 else -(sz*0.4))))
-                    pts.append((max_x-margin, cy)); self.canvas.create_line(pts, fill="black", width=line_w, capstyle="round", tags=tags)
-                else:
-                    l = h_px - 2*margin; step = l/6; pts = [(cx, min_y+margin)]
-                    for i in range(1, 6): pts.append((cx + ((sz*0.4) if i%2!=0 else -(sz*0.4)), min_y+margin + i*step))
-                    pts.append((cx, max_y-margin)); self.canvas.create_line(pts, fill="black", width=line_w, capstyle="round", tags=tags)
-            elif c_type == "C":
-                line_w = max(2, sz * 0.1); gap = sz * 0.3; plate_len = sz * 0.8
-                if w_px > h_px:
-                    self.canvas.create_line(min_x, cy, cx-gap, cy, width=line_w, tags=tags)
-                    self.canvas.create_line(max_x, cy, cx+gap, cy, width=line_w, tags=tags)
-                    self.canvas.create_line(cx-gap, cy-plate_len/2, cx-gap, cy+plate_len/2, width=line_w*2, tags=tags)
-                    self.canvas.create_line(cx+gap, cy-plate_len/2, cx+gap, cy+plate_len/2, width=line_w*2, tags=tags)
-                else:
-                    self.canvas.create_line(cx, min_y, cx, cy-gap, width=line_w, tags=tags)
-                    self.canvas.create_line(cx, max_y, cx, cy+gap, width=line_w, tags=tags)
-                    self.canvas.create_line(cx-plate_len/2, cy-gap, cx+plate_len/2, cy-gap, width=line_w*2, tags=tags)
-                    self.canvas.create_line(cx-plate_len/2, cy+gap, cx+plate_len/2, cy+gap, width=line_w*2, tags=tags)
-            font_size = max(8, int(9*self.scale))
-            text_str = comp.value
-            text_y = cy - sz * 0.6 if is_transparent and w_px > h_px else cy
-            text_x = cx if w_px > h_px else cx + sz * 0.6
-            self.canvas.create_text(text_x, text_y, text=text_str, fill="white", font=("Arial", font_size, "bold"), tags=tags)
-
-    def logic_to_screen(self, lx, ly):
+            self._ghost_key = key
+        self._ghost_cell = (hx, hy)
+
+    def refresh_component(self, uid):
+        """Re-creates the items of one component, or just drops them if it left the board."""
+        self._apply_view()
+        self.canvas.delete(self._comp_tag(uid))
+        comp = self.board.get_component(uid)
+        if comp: self._draw_component(comp, self.cell_size * self.scale)
+
+    def refresh_wire(self, wire):
+        self._apply_view()
+        self.canvas.delete(self._wire_tag(wire))
+        if self.board.has_wire(wire): self._draw_wire(wire, self.cell_size * self.scale)
+
+    # --- Undo / Redo ---
+    def execute(self, cmd):
+        """Applies a history command and refreshes what it touched. Returns False if it was refused."""
+        touched = self.history.do(cmd)
+        if touched is None: return False
+        if touched != ((), ()): self.board_edited(*touched)
+        return True
+
+    def undo(self): self._history_step(self.history.undo())
+    def redo(self): self._history_step(self.history.redo())
+
+    def _history_step(self, touched):
+        if not touched or touched == ((), ()): return
+        self.board_edited(*touched)
+
+    # --- Autorouter ---
+    def autoroute(self, pairs, names=None):
+        """Routes (start, goal) pin pairs on the side in view, off the Tk thread. The wires are added as one undo step;
+        names, one per pair, are the net names for the wires."""
+        if self._route_job: return False
+        side = "back" if self.is_back_view else "front"
+        grid = RoutingGrid.from_board(self.board, side)
+        if self._router is None: self._router = ThreadPoolExecutor(max_workers=1)
+        self._route_job = self._router.submit(route_many, grid, pairs)
+        self.lbl_status.config(text=f"ROUTING {len(pairs)}...")
+        self.root.after(ROUTE_POLL_MS, self._poll_route, self.board, side, list(pairs), names)
+        return True
+
+    def _poll_route(self, board, side, pairs, names=None):
+        job = self._route_job
+        if not job.done():
+            self.root.after(ROUTE_POLL_MS, self._poll_route, board, side, pairs, names)
+            return
+        self._route_job = None
+        self.lbl_status.config(text=f"MODE: {self.mode}")
+        if board is not self.board: return     # another board was opened meanwhile
+        try: paths = job.result()
+        except Exception as e:
+            messagebox.showerror("Autoroute Failed", str(e))
+            return
+        # Edits made while routing may have blocked a path; only those still clear are added
+        grid = RoutingGrid.from_board(board, side)
+        wires = []
+        for i, ((start, goal), path) in enumerate(zip(pairs, paths)):
+            if path and grid.is_clear(path, tuple(start), tuple(goal)):
+                grid.mark(path)
+                wires.append(make_wire(board, path, side, len(wires), names[i] if names else None))
+        if wires: self.execute(Batch(AddWire(board, w) for w in wires))
+        if len(wires) < len(pairs):
+            messagebox.showwarning("Autoroute", f"{len(pairs) - len(wires)} of {len(pairs)} connections could not be routed.")
+
+    def board_edited(self, uids=(), wires=()):
+        """Call after any model change: redraws and re-checks only the touched components and wires."""
+        self.autosave.record(self.board, uids, wires)
+        # Selected items an edit removed are dropped from the selection
+        self.selected_uids = {uid for uid in self.selected_uids if self.board.get_component(uid)}
+        self.selected_wires = {w for w in self.selected_wires if self.board.has_wire(w)}
+        bulk = len(uids) + len(wires) > BULK_REDRAW_ITEMS
+        for uid in uids: 
+            if not bulk: self.refresh_component(uid)
+            self.drc.component_changed(uid)
+        for wire in wires: 
+            if not bulk: self.refresh_wire(wire)
+            self.drc.wire_changed(wire)
+        if bulk: self.redraw_all()
+        self.refresh_net_highlight()
+        self.refresh_drc()
+
+    # --- DRC Overlay ---
+    def refresh_drc(self):
+        self._apply_view()
         sz = self.cell_size * self.scale
-        draw_lx = (self.board.width - 1 - lx) if self.is_back_view else lx
-        return self.offset_x + draw_lx * sz, self.offset_y + ly * sz
+        for key in self.drc.take_changes():
+            tag = self._drc_tags.pop(key, None)
+            if tag: self.canvas.delete(tag)
+            if self.show_drc and key in self.drc.violations: self._draw_violation(key, sz)
+        self._update_drc_hud()
+
+    def _draw_violation(self, key, sz):
+        # Culled like everything else: markers outside the built rect appear on the rebuild that reaches them
+        x1, y1, x2, y2 = self._built_rect
+        where = [(x, y) for x, y in self.drc.violations[key].where if x1 - 1 <= x <= x2 + 1 and y1 - 1 <= y <= y2 + 1]
+        if not where: return
+        self._drc_seq += 1
+        tag = self._drc_tags[key] = f"drc:{self._drc_seq}"
+        tags = self._scene_tags("drc", tag)
+        for x, y in where:
+            sx, sy = self.logic_to_screen(x, y); cx, cy = sx + sz/2, sy + sz/2
+            r = sz * 0.45
+            self.canvas.create_oval(cx-r, cy-r, cx+r, cy+r, outline=COLOR_DRC, width=2, tags=tags)
+            self.canvas.create_line(cx-r*0.5, cy-r*0.5, cx+r*0.5, cy+r*0.5, fill=COLOR_DRC, width=2, tags=tags)
+            self.canvas.create_line(cx-r*0.5, cy+r*0.5, cx+r*0.5, cy-r*0.5, fill=COLOR_DRC, width=2, tags=tags)
+        self._put_in_layer("drc", tag)
+
+    def _update_drc_hud(self):
+        n = len(self.drc.violations)
+        txt = f"DRC: {n} issue{'s' if n != 1 else ''}" if self.show_drc and n else ""
+        self.canvas.itemconfig("drc_hud", text=txt)
+
+    def toggle_drc(self):
+        self.show_drc = not self.show_drc
+        self.canvas.delete("drc"); self._drc_tags = {}
+        self._apply_view()
+        if self.show_drc: self._draw_drc_layer(self.cell_size * self.scale)
+        self._update_drc_hud()
+
+    # --- Profiler ---
+    def toggle_profiler(self): self.profiler.toggle()
+
+    def export_trace(self):
+        if not self.profiler.spans:
+            messagebox.showinfo("Profiler", "Nothing recorded yet. Turn the profiler on with P first.")
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("Trace", "*.json")])
+        if not path: return
+        try: self.profiler.export_trace(path)
+        except OSError as e: messagebox.showerror("Export Failed", str(e))
+
+    # --- Selection ---
+    @property
+    def selected_comp_uid(self):
+        """The selected component's uid when it is all that is selected."""
+        return next(iter(self.selected_uids)) if len(self.selected_uids) == 1 and not self.selected_wires else None
+
+    @property
+    def selected_wire(self):
+        """The selected wire when it is all that is selected."""
+        return next(iter(self.selected_wires)) if len(self.selected_wires) == 1 and not self.selected_uids else None
+
+    def select(self, uids=(), wires=(), add=False, toggle=False):
+        """Replaces the selection (or adds to it, or toggles the given items). Only items whose highlight changes are redrawn."""
+        old_uids, old_wires = self.selected_uids, self.selected_wires
+        if toggle: self.selected_uids, self.selected_wires = old_uids ^ set(uids), old_wires ^ set(wires)
+        elif add: self.selected_uids, self.selected_wires = old_uids | set(uids), old_wires | set(wires)
+        else: self.selected_uids, self.selected_wires = set(uids), set(wires)
+        changed_uids, changed_wires = old_uids ^ self.selected_uids, old_wires ^ self.selected_wires
+        if len(changed_uids) + len(changed_wires) > BULK_REDRAW_ITEMS: self.redraw_all()
+        else:
+            for uid in changed_uids: self.refresh_component(uid)
+            for wire in changed_wires: self.refresh_wire(wire)
+        self.refresh_net_highlight()
+
+    def refresh_net_highlight(self):
+        """Highlights the net of the selected wire. Only items entering or leaving the highlight are redrawn."""
+        old_wires, old_cells = self._net_wires, self._net_cells
+        net = self.board.net_at(*self.selected_wire.points[0]) if self.selected_wire and self.selected_wire.points else None
+        self._net_wires = set(self.board.net_wires(net)) if net is not None else set()
+        self._net_cells = set(self.board.connectivity.net_cells(net)) if net is not None else set()
+        for wire in old_wires ^ self._net_wires: self.refresh_wire(wire)
+        uids = set()
+        for x, y in old_cells ^ self._net_cells:
+            comp = self.board.get_component_at(x, y)
+            if comp: uids.add(comp.uid)
+        for uid in uids: self.refresh_component(uid)
+
     def screen_to_logic(self, sx, sy):
         sz = self.cell_size * self.scale
         lx = round((sx - self.offset_x) / sz); ly = round((sy - self.offset_y) / sz)
         if self.is_back_view: lx = self.board.width - 1 - lx
         return int(lx), int(ly)
-    def on_lib_select(self, e):
-        idx = self.listbox.curselection()
-        if idx: self.current_place_def = self.library[self.listbox.get(idx)]; self.set_mode("PLACE")
     def toggle_view(self): self.is_back_view = not self.is_back_view; self.redraw_all()
     def _bind_events(self):
         self.canvas.bind("<Button-1>", self.on_click); self.canvas.bind("<Double-Button-1>", self.on_double_click)
@@ -668,12 +1223,58 @@ class PCBStudioApp:
         self.root.bind("<a>", lambda e: self.set_mode("PLACE")); self.root.bind("<w>", lambda e: self.set_mode("WIRE"))
         self.root.bind("<x>", lambda e: self.set_mode("DELETE")); self.root.bind("<v>", lambda e: self.toggle_view())
         self.root.bind("<r>", lambda e: self.rotate_key()); self.root.bind("<Delete>", self.on_key_delete)
+        self.root.bind("<d>", lambda e: self.toggle_drc()); self.root.bind("<t>", lambda e: self.set_mode("ROUTE"))
+        self.root.bind("<p>", lambda e: self.toggle_profiler()); self.root.bind("<Control-t>", lambda e: self.export_trace())
+        self.canvas.bind("<Configure>", self.on_resize)
+        self.root.bind("<Control-s>", lambda e: self.save_project()); self.root.bind("<Control-o>", lambda e: self.open_project())
+        self.root.bind("<Control-z>", lambda e: self.undo()); self.root.bind("<Control-y>", lambda e: self.redo())
+        self.root.bind("<Control-Z>", lambda e: self.redo())
+        self.root.bind("<c>", lambda e: self.recolor_selection()); self.root.bind("<Control-a>", lambda e: self.select_all())
+        self.root.bind("<Control-r>", lambda e: self.open_step_repeat())
+        self.canvas.bind("<B1-Motion>", self.on_drag); self.canvas.bind("<ButtonRelease-1>", self.end_drag)
     def start_pan(self, e): self.is_panning=True; self.last_mouse_x=e.x; self.last_mouse_y=e.y
     def do_pan(self, e): 
-        if self.is_panning: self.offset_x += e.x - self.last_mouse_x; self.offset_y += e.y - self.last_mouse_y; self.last_mouse_x, self.last_mouse_y = e.x, e.y; self.redraw_all()
-    def end_pan(self, e): self.is_panning=False
-    def on_zoom(self, e): f = 0.9 if e.delta<0 else 1.1; self.offset_x = e.x - (e.x - self.offset_x)*f; self.offset_y = e.y - (e.y - self.offset_y)*f; self.scale *= f; self.redraw_all()
-    def rotate_key(self): self.place_rotation = (self.place_rotation+90)%360; self.redraw_all()
+        if self.is_panning: 
+            dx, dy = e.x - self.last_mouse_x, e.y - self.last_mouse_y
+            self.last_mouse_x, self.last_mouse_y = e.x, e.y
+            self.execute(PanView(self, dx, dy))
+    def pan_by(self, dx, dy):
+        self.offset_x += dx; self.offset_y += dy
+        a, bx, by = self._view_xform; self._view_xform = (a, bx + dx, by + dy)
+        self.request_frame("view")
+    def end_pan(self, e): self.is_panning=False; self.history.seal()
+    def on_resize(self, e): self.request_frame("view")
+    def on_zoom(self, e): 
+        f = 0.9 if e.delta<0 else 1.1; self.offset_x = e.x - (e.x - self.offset_x)*f; self.offset_y = e.y - (e.y - self.offset_y)*f; self.scale *= f
+        # Scaling about (e.x, e.y) composed onto whatever pan/zoom is still pending
+        a, bx, by = self._view_xform; self._view_xform = (a*f, bx*f + (1-f)*e.x, by*f + (1-f)*e.y)
+        self.request_frame("view")
+        if self._zoom_job: self.root.after_cancel(self._zoom_job)
+        self._zoom_job = self.root.after(ZOOM_SETTLE_MS, self._settle_zoom)
+    def _settle_zoom(self): self._zoom_job = None; self.request_frame("full")
+
+    # --- Frame scheduling: handlers only update state; the canvas catches up once per frame ---
+    def request_frame(self, what):
+        self._frame_dirty.add(what)
+        self.frames.request()
+
+    def _render_frame(self):
+        dirty, self._frame_dirty = self._frame_dirty, set()
+        if "full" in dirty: return self.redraw_all()
+        self._apply_view()
+        if "view" in dirty and not self._view_covered(): return self.redraw_all()
+        if "overlay" in dirty: self.redraw_overlay()
+    def _apply_view(self):
+        """Moves the scene to the current pan/zoom. Run before drawing anything at the current offset and scale,
+        or the pending transform would shift the new items a second time."""
+        a, bx, by = self._view_xform; self._view_xform = (1.0, 0.0, 0.0)
+        # canvas.scale only moves coordinates; line widths and fonts are fixed up once the wheel stops
+        if a != 1.0: self.canvas.scale("scene", 0, 0, a, a)
+        if bx or by: self.canvas.move("scene", bx, by)
+
+    def rotate_key(self):
+        if self.mode == "SELECT": return self.rotate_selection()
+        self.place_rotation = (self.place_rotation+90)%360; self.redraw_overlay()
 
 if __name__ == "__main__":
     root = tk.Tk()
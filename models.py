@@ -1,13 +1,62 @@
 # models.py
 import json
 import math
+import sys
+from array import array
+from collections import namedtuple
+
+INDEX_BUCKET_SIZE = 4   # grid cells per side of a spatial-index bucket
+WIRE_HIT_THRESHOLD = 0.5
+
+def _intern(s): return sys.intern(s) if type(s) is str else s
+
+def _pack_flat(flat):
+    """x0, y0, x1, y1, ... as an array: 4-byte ints when every coordinate is whole, doubles otherwise."""
+    try: return array("i", flat)
+    except (TypeError, OverflowError): return array("d", flat)
+
+def _pack(points):
+    if isinstance(points, WirePoints): return points.flat    # never mutated, so safe to share
+    return _pack_flat([v for p in points for v in p])
+
+class WirePoints:
+    """Read-only sequence of (x, y) tuples over a wire's flat coordinate array."""
+    __slots__ = ("flat",)
+    def __init__(self, flat): self.flat = flat
+    def __len__(self): return len(self.flat) >> 1
+    def __iter__(self):
+        it = iter(self.flat)
+        return zip(it, it)
+    def __getitem__(self, i):
+        if isinstance(i, slice): return list(self)[i]
+        return self.flat[2 * i], self.flat[2 * i + 1]   # negative i works too: -1 -> flat[-2], flat[-1]
+    def __eq__(self, other):
+        try: return len(self) == len(other) and all(p == tuple(q) for p, q in zip(self, other))
+        except TypeError: return NotImplemented
+    __hash__ = None
+    def __repr__(self): return repr(list(self))
 
 class Wire:
+    # Identity-hashed and kept in many index dicts, so no per-instance __dict__; points live in one flat array
+    __slots__ = ("_flat", "name", "color", "side")
+
     def __init__(self, points, name="Wire", color="#FF0000", side="back"):
-        self.points = points 
-        self.name = name
-        self.color = color
-        self.side = side 
+        self._flat = _pack(points)
+        self.name = _intern(name)
+        self.color = _intern(color)
+        self.side = _intern(side)
+
+    @property
+    def points(self):
+        """The points as (x, y) tuples. Assigning replaces them; the returned view stays as it was."""
+        return WirePoints(self._flat)
+    @points.setter
+    def points(self, points): self._flat = _pack(points)
+
+    @property
+    def coords(self):
+        """Flat x0, y0, x1, y1, ... array, for callers that want the numbers without tuples. Do not modify."""
+        return self._flat
 
     @property
     def start_term(self):
@@ -17,12 +66,12 @@ class Wire:
     def end_term(self):
         return self.points[-1] if self.points else None
 
-    def is_point_on_wire(self, x, y, threshold=0.5):
-        if len(self.points) < 2: return False
-        for i in range(len(self.points) - 1):
-            if self._dist_point_to_segment(x, y, self.points[i], self.points[i+1]) < threshold:
-                return True
-        return False
+    def is_point_on_wire(self, x, y, threshold=WIRE_HIT_THRESHOLD):
+        return any(self.is_point_on_segment(i, x, y, threshold) for i in range(len(self._flat) // 2 - 1))
+
+    def is_point_on_segment(self, i, x, y, threshold=WIRE_HIT_THRESHOLD):
+        f = self._flat
+        return self._dist_point_to_segment(x, y, (f[2*i], f[2*i+1]), (f[2*i+2], f[2*i+3])) < threshold
 
     def _dist_point_to_segment(self, px, py, p1, p2):
         x1, y1 = p1; x2, y2 = p2
@@ -32,21 +81,69 @@ class Wire:
         t = max(0, min(1, t))
         return math.hypot(px - (x1 + t * dx), py - (y1 + t * dy))
 
+    @classmethod
+    def from_coords(cls, flat, name="Wire", color="#FF0000", side="back"):
+        """A wire from a flat x0, y0, x1, y1, ... list, as project and journal files store it."""
+        wire = cls((), name, color, side)
+        wire._flat = _pack_flat(flat)
+        return wire
+
     def to_dict(self):
-        return {"points": self.points, "name": self.name, "color": self.color, "side": self.side}
+        return {"points": list(self.points), "name": self.name, "color": self.color, "side": self.side}
     @staticmethod
     def from_dict(data):
         return Wire(data["points"], data["name"], data["color"], data.get("side", "back"))
 
+def segment_in_rect(p1, p2, x1, y1, x2, y2):
+    """Whether any part of segment p1-p2 lies inside the rect (Liang-Barsky clipping)."""
+    (ax, ay), (bx, by) = p1, p2
+    t0, t1 = 0.0, 1.0
+    for p, q in ((ax - bx, ax - x1), (bx - ax, x2 - ax), (ay - by, ay - y1), (by - ay, y2 - ay)):
+        if p == 0:
+            if q < 0: return False
+            continue
+        t = q / p
+        if p < 0: t0 = max(t0, t)
+        else: t1 = min(t1, t)
+        if t0 > t1: return False
+    return True
+
+# Rotated layout of a definition: cells = [(rel_x, rel_y, pin_label or None)], pins = {(rel_x, rel_y): label},
+# body = frozenset of (rel_x, rel_y), width/height = rotated bounding box
+Footprint = namedtuple("Footprint", ["cells", "pins", "body", "width", "height"])
+
 class ComponentDefinition:
+    __slots__ = ("name", "width", "height", "pin_labels", "comp_type", "default_color", "body_cells", "_footprints")
+
     def __init__(self, name, width, height, pin_labels, comp_type="IC", default_color="#555", body_cells=None):
         self.name = name
         self.width = width
         self.height = height
         self.pin_labels = pin_labels 
-        self.comp_type = comp_type
-        self.default_color = default_color
+        self.comp_type = _intern(comp_type)
+        self.default_color = _intern(default_color)
         self.body_cells = body_cells if body_cells else set((x, y) for x in range(width) for y in range(height))
+        self._footprints = {}
+
+    def footprint(self, rotation=0, width=None, height=None):
+        """Body cells and pins rotated for a placement, cached per (rotation, size) and shared by all placements."""
+        cw = width if width else self.width
+        ch = height if height else self.height
+        key = (rotation, cw, ch)
+        fp = self._footprints.get(key)
+        if fp is None:
+            w, h = (ch, cw) if rotation in (90, 270) else (cw, ch)
+            cells = []
+            for bx, by in sorted(self.body_cells, key=lambda c: (c[1], c[0])):
+                # Inverse of PlacedComponent.get_rotated_coords
+                if rotation == 90:    rx, ry = ch - 1 - by, bx
+                elif rotation == 180: rx, ry = cw - 1 - bx, ch - 1 - by
+                elif rotation == 270: rx, ry = by, cw - 1 - bx
+                else:                 rx, ry = bx, by
+                if 0 <= rx < w and 0 <= ry < h: cells.append((rx, ry, self.pin_labels.get((bx, by))))
+            pins = {(rx, ry): pin for rx, ry, pin in cells if pin}
+            fp = self._footprints[key] = Footprint(cells, pins, frozenset((rx, ry) for rx, ry, _ in cells), w, h)
+        return fp
 
     def to_dict(self):
         pins_str = {f"{k[0]},{k[1]}": v for k, v in self.pin_labels.items()}
@@ -60,16 +157,19 @@ class ComponentDefinition:
         return ComponentDefinition(data["name"], data["width"], data["height"], pins, data["comp_type"], data["default_color"], body)
 
 class PlacedComponent:
+    # Large boards hold tens of thousands of these; colors and values repeat, so they are interned
+    __slots__ = ("definition", "x", "y", "uid", "rotation", "custom_color", "custom_width", "custom_height", "value")
+
     def __init__(self, definition, x, y, uid, rotation=0, color=None, custom_width=None, custom_height=None, value=None):
         self.definition = definition
         self.x = x
         self.y = y
         self.uid = uid
         self.rotation = rotation 
-        self.custom_color = color if color else definition.default_color
+        self.custom_color = _intern(color) if color else definition.default_color
         self.custom_width = custom_width if custom_width else definition.width
         self.custom_height = custom_height if custom_height else definition.height
-        self.value = value if value else definition.name
+        self.value = _intern(value) if value else definition.name
 
     @property
     def width(self): return self.custom_height if self.rotation in [90, 270] else self.custom_width
@@ -83,56 +183,444 @@ class PlacedComponent:
         if self.rotation == 270: return self.custom_width - 1 - rel_y, rel_x
         return rel_x, rel_y
 
+    @property
+    def footprint(self): return self.definition.footprint(self.rotation, self.custom_width, self.custom_height)
+
     def get_pin_at(self, board_x, board_y):
-        orig_x, orig_y = self.get_rotated_coords(board_x - self.x, board_y - self.y)
-        return self.definition.pin_labels.get((orig_x, orig_y))
+        return self.footprint.pins.get((board_x - self.x, board_y - self.y))
+
+    def iter_cells(self):
+        """Yields (board_x, board_y, pin_label) for every body cell; pin_label is None for plain body."""
+        x, y = self.x, self.y
+        for rx, ry, pin in self.footprint.cells: yield x + rx, y + ry, pin
 
     def is_body_at(self, board_x, board_y):
-        rel_x, rel_y = board_x - self.x, board_y - self.y
-        if not (0 <= rel_x < self.width and 0 <= rel_y < self.height): return False
-        orig_x, orig_y = self.get_rotated_coords(rel_x, rel_y)
-        return (orig_x, orig_y) in self.definition.body_cells
+        return (board_x - self.x, board_y - self.y) in self.footprint.body
+
+class Connectivity:
+    """Union-find over the cells that wire points land on. A net is identified by its root cell.
+
+    Adding a wire only unions its points. Removing one resets just the nets it touched and
+    re-unions the wires still attached to their cells, so cost follows net size, not board size.
+    """
+    def __init__(self):
+        self._parent = {}
+        self._members = {}      # root -> list of cells; a cell is in one net only, so lists do
+        self._cell_wires = {}   # cell -> tuple of wires with a point on the cell, oldest first
+        self._wire_cells = {}   # wire -> its points when it was added (a view that later edits do not change)
+
+    def find(self, cell):
+        parent = self._parent
+        root = cell
+        while parent[root] != root: root = parent[root]
+        while parent[cell] != root: parent[cell], cell = root, parent[cell]
+        return root
+
+    def _node(self, cell):
+        if cell not in self._parent:
+            self._parent[cell] = cell
+            self._members[cell] = [cell]
+
+    def _union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb: return
+        if len(self._members[ra]) < len(self._members[rb]): ra, rb = rb, ra
+        self._parent[rb] = ra
+        self._members[ra] += self._members.pop(rb)
+
+    def _link(self, wire):
+        cells = list(self._wire_cells[wire])
+        for cell in cells: self._node(cell)
+        for a, b in zip(cells, cells[1:]): self._union(a, b)
+
+    def add_wire(self, wire):
+        cells = self._wire_cells[wire] = wire.points
+        cell_wires = self._cell_wires
+        for cell in cells:
+            attached = cell_wires.get(cell, ())
+            if wire not in attached: cell_wires[cell] = attached + (wire,)
+        self._link(wire)
+
+    def remove_wire(self, wire):
+        cells = set(self._wire_cells.pop(wire, ()))
+        affected = set()
+        for cell in cells:
+            if cell in self._parent: affected.update(self._members[self.find(cell)])
+            attached = self._cell_wires.get(cell)
+            if attached is not None:
+                attached = tuple(w for w in attached if w is not wire)
+                if attached: self._cell_wires[cell] = attached
+                else: del self._cell_wires[cell]
+        # Re-form the touched nets from the wires that are left
+        for cell in affected: self._members.pop(cell, None); del self._parent[cell]
+        for cell in affected:
+            if cell in self._cell_wires: self._node(cell)
+        for w in set(w for cell in affected for w in self._cell_wires.get(cell, ())): self._link(w)
+
+    def net_of(self, cell):
+        return self.find(cell) if cell in self._parent else None
+
+    def net_cells(self, net): return self._members.get(net, ())
+    def nets(self): return list(self._members)
+    def wires_at(self, cell): return list(self._cell_wires.get(cell, ()))
+
+    def net_wires(self, net):
+        return list(dict.fromkeys(w for cell in self.net_cells(net) for w in self._cell_wires.get(cell, ())))
 
 class Board:
     def __init__(self, width, height):
         self.width = width
         self.height = height
-        self.components = [] 
         self.wires = []
-    
-    def add_component_instance(self, placed_comp):
-        # 1. Strict Boundary Check (Update)
+        # Occupancy grid: cell index -> (uid, pin_label) of the covering component
+        self._cells = [None] * (width * height)
+        self._comp_cells = {}   # uid -> cell indices it occupies
+        self._by_uid = {}       # uid -> component, in draw order; see components
+        self._uid_seq = 0       # next number for new_uid; only ever grows
+        self._comp_buckets = {} # bucket (bx, by) -> uids with a body cell in it
+        self._comp_keys = {}
+        self._comp_order = {}   # uid -> insertion sequence (draw order)
+        self._comp_seq = 0
+        # Wire segment index: bucket (bx, by) -> array of (wire seq, segment index) pairs, flattened.
+        # Flat int arrays rather than a dict and list per wire keep it small on boards with 100k+ segments.
+        self._wire_buckets = {}
+        self._wire_keys = {}    # wire -> bucket keys it was filed under, flattened into array("i", [bx, by, ...])
+        self._wire_order = {}   # wire -> insertion sequence, later wins on hit tests
+        self._wire_at = {}      # insertion sequence -> wire
+        self._wire_seq = 0
+        self.connectivity = Connectivity()
+        # Intended connections from an imported netlist: net name -> ((uid, pin label), ...). The dict is
+        # replaced as a whole (history.SetImportedNets), never edited in place, so a new one means a change
+        self.imported_nets = {}
+
+    @property
+    def components(self):
+        """Components in draw order (a live view; take list() of it before adding or removing while iterating)."""
+        return self._by_uid.values()
+
+    def components_in_order(self, uids):
+        """The components with the given uids that are on the board, in draw order."""
+        return [self._by_uid[uid] for uid in sorted((u for u in uids if u in self._by_uid), key=self._comp_order.__getitem__)]
+
+    def new_uid(self):
+        """A fresh "u<n>" uid. Numbers are never handed out twice, so a deleted part's uid is not reused."""
+        while f"u{self._uid_seq}" in self._by_uid: self._uid_seq += 1
+        self._uid_seq += 1
+        return f"u{self._uid_seq - 1}"
+
+    def _cell_index(self, x, y):
+        if 0 <= x < self.width and 0 <= y < self.height: return y * self.width + x
+        return None
+
+    def _footprint(self, placed_comp, ignore_uid=None):
+        """Cell indices and pin labels for placed_comp, or None if it leaves the board or overlaps a part."""
         # Check negative coordinates
         if placed_comp.x < 0 or placed_comp.y < 0:
-            return False
+            return None
         # Check positive overflow
         if placed_comp.x + placed_comp.width > self.width or placed_comp.y + placed_comp.height > self.height:
-            return False
-        
-        self.components.append(placed_comp)
+            return None
+        cells = []
+        for x, y, pin in placed_comp.iter_cells():
+            idx = y * self.width + x
+            hit = self._cells[idx]
+            if hit is not None and hit[0] != ignore_uid: return None
+            cells.append((idx, pin))
+        return cells
+
+    def _occupy(self, uid, cells):
+        keys = set()
+        body = (uid, None)      # one shared entry for all plain body cells of the part
+        for idx, pin in cells: 
+            self._cells[idx] = (uid, pin) if pin else body
+            keys.add(((idx % self.width) // INDEX_BUCKET_SIZE, (idx // self.width) // INDEX_BUCKET_SIZE))
+        for key in keys: self._comp_buckets.setdefault(key, set()).add(uid)
+        self._comp_cells[uid] = array("i", [idx for idx, _ in cells])
+        self._comp_keys[uid] = tuple(keys)
+
+    def _release(self, uid):
+        for idx in self._comp_cells.pop(uid, ()): self._cells[idx] = None
+        for key in self._comp_keys.pop(uid, ()):
+            bucket = self._comp_buckets[key]
+            bucket.discard(uid)
+            if not bucket: del self._comp_buckets[key]
+
+    def _bucket_range(self, x1, y1, x2, y2):
+        for bx in range(math.floor(x1 / INDEX_BUCKET_SIZE), math.floor(x2 / INDEX_BUCKET_SIZE) + 1):
+            for by in range(math.floor(y1 / INDEX_BUCKET_SIZE), math.floor(y2 / INDEX_BUCKET_SIZE) + 1):
+                yield bx, by
+
+    def components_in_rect(self, x1, y1, x2, y2):
+        """Components with a body cell in the bucket neighbourhood of the inclusive rect, in draw order."""
+        found = set()
+        for key in self._bucket_range(x1, y1, x2, y2): found |= self._comp_buckets.get(key, set())
+        return [self._by_uid[uid] for uid in sorted(found, key=self._comp_order.__getitem__)]
+
+    def wires_in_rect(self, x1, y1, x2, y2):
+        """Wires with a segment in the bucket neighbourhood of the inclusive rect, in draw order."""
+        found = set()
+        for key in self._bucket_range(x1, y1, x2, y2): found.update(self._wire_buckets.get(key, ())[::2])
+        return [self._wire_at[seq] for seq in sorted(found)]
+
+    def items_in_rect(self, x1, y1, x2, y2):
+        """(components, wires) with a body cell or a stretch of wire inside the inclusive rect, in draw order."""
+        comps = [c for c in self.components_in_rect(x1, y1, x2, y2)
+                 if any(x1 <= x <= x2 and y1 <= y <= y2 for x, y, _ in c.iter_cells())]
+        wires = []
+        for wire in self.wires_in_rect(x1, y1, x2, y2):
+            points = wire.points
+            if any(segment_in_rect(points[i], points[i+1], x1, y1, x2, y2) for i in range(len(points) - 1)): wires.append(wire)
+        return comps, wires
+
+    def points_fit(self, points):
+        """True if every (x, y) point lies on the board."""
+        w, h = self.width, self.height
+        return all(0 <= x < w and 0 <= y < h for x, y in points)
+
+    def can_place(self, placed_comp):
+        return self._footprint(placed_comp) is not None
+
+    def add_component_instance(self, placed_comp, seq=None):
+        """Adds a part on top of the draw order, or at seq (from comp_seq) when an undo puts it back."""
+        # Strict boundary and overlap check against the occupancy grid
+        if placed_comp.uid in self._by_uid: return False
+        cells = self._footprint(placed_comp)
+        if cells is None: return False
+        self._insert(placed_comp, cells, seq)
+        if seq is not None: self._restore_comp_order()
+        return True
+
+    def _insert(self, placed_comp, cells, seq=None):
+        # A part without a uid gets one only now, so refused placements use none up
+        if placed_comp.uid is None: placed_comp.uid = self.new_uid()
+        uid = placed_comp.uid
+        self._by_uid[uid] = placed_comp
+        # Loaded or pasted parts keep their uids; new_uid continues after the highest one
+        if uid[:1] == "u" and uid[1:].isdigit(): self._uid_seq = max(self._uid_seq, int(uid[1:]) + 1)
+        if seq is None: self._comp_seq += 1; seq = self._comp_seq
+        self._comp_order[uid] = seq
+        self._occupy(uid, cells)
+
+    def _restore_comp_order(self):
+        # Parts put back at their old seq were appended to _by_uid; re-sort it in place (nearly sorted, so cheap)
+        items = sorted(self._by_uid.items(), key=lambda item: self._comp_order[item[0]])
+        self._by_uid.clear(); self._by_uid.update(items)
+
+    def comp_seq(self, uid):
+        """The part's place in the draw order, for putting it back there after a delete."""
+        return self._comp_order.get(uid)
+
+    def wire_seq(self, wire): return self._wire_order.get(wire)
+
+    def misfits(self, comps):
+        """The new parts among comps that would leave the board, overlap a part on it or overlap each other,
+        or whose uid is taken on the board or earlier in comps (parts with uid None get theirs when added).
+        One pass over the occupancy grid; nothing is changed."""
+        claimed, uids, bad = set(), set(), []
+        for comp in comps:
+            taken = comp.uid is not None and (comp.uid in self._by_uid or comp.uid in uids)
+            cells = None if taken else self._footprint(comp)
+            if cells is None or any(idx in claimed for idx, _ in cells): bad.append(comp)
+            else:
+                claimed.update(idx for idx, _ in cells)
+                uids.add(comp.uid)
+        return bad
+
+    def add_components(self, comps, seqs=None):
+        """Adds new parts all together, or none of them if any is a misfit. seqs, one per part, puts them back
+        at their old places in the draw order (see add_component_instance)."""
+        if self.misfits(comps): return False
+        for comp, seq in zip(comps, seqs or [None] * len(comps)): self._insert(comp, self._footprint(comp), seq)
+        if seqs: self._restore_comp_order()
+        return True
+
+    def update_components(self, comps):
+        """update_component for parts that move together, so one may take another's old cells. All or nothing."""
+        old = {c.uid: [(idx, self._cells[idx][1]) for idx in self._comp_cells[c.uid]] for c in comps}
+        for uid in old: self._release(uid)
+        done = []
+        for comp in comps:
+            cells = self._footprint(comp)
+            if cells is None:
+                for uid in done: self._release(uid)
+                for uid, cells in old.items(): self._occupy(uid, cells)
+                return False
+            self._occupy(comp.uid, cells); done.append(comp.uid)
+        return True
+
+    def update_component(self, placed_comp):
+        """Re-indexes a component after its position, rotation or size changed. Returns False if it no longer fits."""
+        cells = self._footprint(placed_comp, ignore_uid=placed_comp.uid)
+        if cells is None: return False
+        self._release(placed_comp.uid)
+        self._occupy(placed_comp.uid, cells)
         return True
 
     def remove_component(self, uid):
-        self.components = [c for c in self.components if c.uid != uid]
+        if uid not in self._by_uid: return
+        self._release(uid)
+        del self._by_uid[uid]
+        del self._comp_order[uid]
     
     def remove_wire(self, wire):
-        if wire in self.wires: self.wires.remove(wire)
+        if wire in self._wire_order:
+            self.wires.remove(wire)
+            self._unindex_wire(wire)
+            self.connectivity.remove_wire(wire)
+            del self._wire_at[self._wire_order.pop(wire)]
+
+    def remove_wires(self, wires):
+        """remove_wire for many wires, with one pass over the wire list."""
+        gone = {w for w in wires if w in self._wire_order}
+        if not gone: return
+        self.wires = [w for w in self.wires if w not in gone]
+        for wire in gone:
+            self._unindex_wire(wire)
+            self.connectivity.remove_wire(wire)
+            del self._wire_at[self._wire_order.pop(wire)]
+
+    def _index_wire(self, wire):
+        keys = {}
+        seq, points = self._wire_order[wire], wire.points
+        for i in range(len(points) - 1):
+            for key in self._segment_buckets(points[i], points[i+1]):
+                bucket = self._wire_buckets.get(key)
+                if bucket is None: bucket = self._wire_buckets[key] = array("i")
+                bucket.extend((seq, i))
+                keys[key] = None
+        self._wire_keys[wire] = array("i", [n for key in keys for n in key])
+
+    def _segment_buckets(self, p1, p2):
+        """Buckets within hit distance of a segment, walked column by column so diagonals stay cheap."""
+        (x1, y1), (x2, y2) = sorted((p1, p2))
+        pad, size = WIRE_HIT_THRESHOLD, INDEX_BUCKET_SIZE
+        for bx in range(math.floor((x1 - pad) / size), math.floor((x2 + pad) / size) + 1):
+            if x1 == x2: ya, yb = y1, y2
+            else:
+                # y of the segment over the part of it whose x is within pad of this column
+                t0 = max(0.0, min(1.0, (bx * size - pad - x1) / (x2 - x1)))
+                t1 = max(0.0, min(1.0, ((bx + 1) * size + pad - x1) / (x2 - x1)))
+                ya, yb = y1 + t0 * (y2 - y1), y1 + t1 * (y2 - y1)
+            for by in range(math.floor((min(ya, yb) - pad) / size), math.floor((max(ya, yb) + pad) / size) + 1):
+                yield bx, by
+
+    def _unindex_wire(self, wire):
+        seq, keys = self._wire_order[wire], self._wire_keys.pop(wire, ())
+        for key in zip(keys[::2], keys[1::2]):
+            bucket = self._wire_buckets[key]
+            kept = array("i")
+            for k in range(0, len(bucket), 2):
+                if bucket[k] != seq: kept.extend(bucket[k:k+2])
+            if kept: self._wire_buckets[key] = kept
+            else: del self._wire_buckets[key]
+
+    def update_wire(self, wire):
+        """Re-files a wire in the segment index after its points changed."""
+        if wire not in self._wire_order: return
+        self._unindex_wire(wire)
+        self._index_wire(wire)
+        self.connectivity.remove_wire(wire)
+        self.connectivity.add_wire(wire)
+
+    def has_wire(self, wire): return wire in self._wire_order
+
+    def segment_pairs_near(self, wire):
+        """Yields (other_wire, i, j): segment i of wire and segment j of other_wire share an index bucket."""
+        seen = set()
+        seq, keys = self._wire_order.get(wire), self._wire_keys.get(wire, ())
+        for key in zip(keys[::2], keys[1::2]):
+            bucket = self._wire_buckets[key]
+            mine = [bucket[k+1] for k in range(0, len(bucket), 2) if bucket[k] == seq]
+            for k in range(0, len(bucket), 2):
+                other, j = bucket[k], bucket[k+1]
+                if other == seq: continue
+                for i in mine:
+                    if (other, i, j) in seen: continue
+                    seen.add((other, i, j))
+                    yield self._wire_at[other], i, j
+
+    def get_component(self, uid): return self._by_uid.get(uid)
 
     def get_component_at(self, x, y):
-        for comp in reversed(self.components):
-            if comp.is_body_at(x, y): return comp
-        return None
+        idx = self._cell_index(x, y)
+        hit = self._cells[idx] if idx is not None else None
+        return self._by_uid[hit[0]] if hit else None
     
     def get_wire_at(self, x, y):
-        for wire in reversed(self.wires):
-            if wire.is_point_on_wire(x, y): return wire
-        return None
+        bucket = self._wire_buckets.get((math.floor(x / INDEX_BUCKET_SIZE), math.floor(y / INDEX_BUCKET_SIZE)))
+        if not bucket: return None
+        best = -1
+        for k in range(0, len(bucket), 2):
+            seq = bucket[k]
+            if seq > best and self._wire_at[seq].is_point_on_segment(bucket[k+1], x, y): best = seq
+        return self._wire_at[best] if best >= 0 else None
 
     def get_pin_obj_at(self, x, y):
-        for comp in reversed(self.components):
-            pin_name = comp.get_pin_at(x, y)
-            if pin_name: return comp, pin_name
+        idx = self._cell_index(x, y)
+        hit = self._cells[idx] if idx is not None else None
+        if hit and hit[1]: return self._by_uid[hit[0]], hit[1]
         return None, None
 
-    def add_wire(self, wire): self.wires.append(wire)
-    def is_location_blocked(self, x, y): return self.get_component_at(x, y) is not None
\ No newline at end of file
+    def add_wire(self, wire, seq=None):
+        """Adds a wire on top of the draw order, or at seq (from wire_seq) when an undo puts it back."""
+        if seq is None: self._wire_seq += 1; seq = self._wire_seq
+        self._wire_order[wire] = seq; self._wire_at[seq] = wire
+        order, lo, hi = self._wire_order, 0, len(self.wires)
+        if hi and order[self.wires[-1]] > seq:
+            while lo < hi:      # binary search; bisect's key= needs Python 3.10
+                mid = (lo + hi) // 2
+                if order[self.wires[mid]] < seq: lo = mid + 1
+                else: hi = mid
+            self.wires.insert(lo, wire)
+        else: self.wires.append(wire)
+        self._index_wire(wire)
+        self.connectivity.add_wire(wire)
+
+    def add_wires(self, wires, seqs=None):
+        """add_wire for many wires; the wire list is re-sorted once if any goes back below the top."""
+        for wire, seq in zip(wires, seqs or [None] * len(wires)):
+            if seq is None: self._wire_seq += 1; seq = self._wire_seq
+            self._wire_order[wire] = seq; self._wire_at[seq] = wire
+            self._index_wire(wire)
+            self.connectivity.add_wire(wire)
+        self.wires.extend(wires)
+        if seqs: self.wires.sort(key=self._wire_order.__getitem__)
+
+    # --- Nets ---
+    # Wire points that share a cell are joined; a pin belongs to the net of the cell it sits on.
+    def net_at(self, x, y): return self.connectivity.net_of((x, y))
+    def nets(self): return self.connectivity.nets()
+    def net_wires(self, net): return self.connectivity.net_wires(net)
+    def wires_at(self, x, y): return self.connectivity.wires_at((x, y))
+
+    def net_pins(self, net):
+        """(component, pin_label) pairs on the net, looked up through the occupancy grid."""
+        pins = []
+        for x, y in self.connectivity.net_cells(net):
+            idx = self._cell_index(x, y)
+            hit = self._cells[idx] if idx is not None else None
+            if hit and hit[1]: pins.append((self._by_uid[hit[0]], hit[1]))
+        return pins
+
+    def netlist(self):
+        """{net: [(component, pin_label), ...]} for every net that reaches at least one pin."""
+        result = {}
+        for net in self.nets():
+            pins = self.net_pins(net)
+            if pins: result[net] = pins
+        return result
+
+    def unconnected_pins(self):
+        """Pins that share a net with no other pin."""
+        out = []; pin_counts = {}
+        for comp in self.components:
+            for x, y, pin in comp.iter_cells():
+                if not pin: continue
+                net = self.net_at(x, y)
+                if net is not None and net not in pin_counts: pin_counts[net] = len(self.net_pins(net))
+                if net is None or pin_counts[net] < 2: out.append((comp, pin))
+        return out
+
+    def is_location_blocked(self, x, y): 
+        idx = self._cell_index(x, y)
+        return idx is not None and self._cells[idx] is not None
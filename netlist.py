@@ -0,0 +1,246 @@
+# netlist.py
+# Netlist / BOM import: parts become placed components, nets become the connections to route.
+# Files are read as a stream, so only the records themselves are held, never the whole text.
+#   KiCad .net    (export ... (components (comp (ref R1) (value 10k) (footprint Lib:R_Axial) ...))
+#                            (nets (net (code 1) (name GND) (node (ref R1) (pin 1)) ...)))
+#   CSV           header row; columns ref (or reference/designator), value, footprint (or package), net, pin.
+#                 A row with a footprint declares parts (a designator cell may list several: "R1, R2");
+#                 a row with net, ref and pin connects that pin.
+import csv
+import os
+import re
+from collections import namedtuple
+from models import PlacedComponent
+
+READ_CHUNK = 1 << 16
+PACK_GAP = 1            # free cells left between imported parts, room for wires
+REF_TYPES = {"R": "R", "C": "C", "D": "D", "LED": "D"}     # reference prefix -> library comp_type; others are ICs
+
+ImportResult = namedtuple("ImportResult", ["comps", "nets", "unmapped", "unplaced", "missing_pins"])
+# comps: new PlacedComponents (not on the board yet); nets: {net name: ((uid, pin label), ...)}, as Board.imported_nets holds them
+# unmapped: {ref: footprint} with no library part; unplaced: refs that did not fit; missing_pins: [(ref, pin)]
+
+# --- KiCad S-expressions ---
+OPEN, CLOSE = object(), object()
+_TOKEN = re.compile(r'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|([^\s()"]+))')
+
+def _tokens(f, chunk=READ_CHUNK):
+    """OPEN, CLOSE and atom strings from a file, read chunk by chunk. A token cut by a chunk end waits for the next."""
+    buf, eof = "", False
+    while True:
+        pos = 0
+        while True:
+            m = _TOKEN.match(buf, pos)
+            if not m or (m.end() == len(buf) and not eof): break
+            pos = m.end()
+            opened, closed, quoted, atom = m.groups()
+            if opened: yield OPEN
+            elif closed: yield CLOSE
+            elif quoted is not None: yield re.sub(r"\\(.)", r"\1", quoted)
+            else: yield atom
+        buf = buf[pos:]
+        if eof:
+            if buf.strip(): raise ValueError(f"Unreadable netlist text near {buf[:40]!r}")
+            return
+        data = f.read(chunk)
+        eof = not data
+        buf += data
+
+def _head(tokens):
+    """The name of a list whose OPEN was just read."""
+    head = next(tokens, None)
+    if head is None: raise ValueError("Netlist ends inside a list")
+    if head is OPEN or head is CLOSE: raise ValueError("List without a name in netlist")
+    return head
+
+def _tree(tokens, head):
+    """The rest of a list whose OPEN and head were already read, as [head, items...]; sub-lists nest."""
+    out = [head]
+    for tok in tokens:
+        if tok is CLOSE: return out
+        if tok is OPEN: out.append(_tree(tokens, _head(tokens)))
+        else: out.append(tok)
+    raise ValueError("Netlist ends inside a list")
+
+def _fields(tree):
+    return {item[0]: item[1] for item in tree[1:] if isinstance(item, list) and len(item) > 1}
+
+def read_kicad(f):
+    """("part", ref, value, footprint) and ("node", net, ref, pin) records. Only comp and net lists are built."""
+    tokens = _tokens(f)
+    heads = []
+    for tok in tokens:
+        if tok is CLOSE:
+            if heads: heads.pop()
+            continue
+        if tok is not OPEN: continue
+        head = _head(tokens)
+        parent = heads[-1] if heads else None
+        if head == "comp" and parent == "components":
+            fields = _fields(_tree(tokens, head))
+            if "ref" in fields: yield "part", fields["ref"], fields.get("value", ""), fields.get("footprint", "")
+        elif head == "net" and parent == "nets":
+            tree = _tree(tokens, head)
+            name = _fields(tree).get("name") or _fields(tree).get("code", "")
+            for node in tree[1:]:
+                if isinstance(node, list) and node[0] == "node":
+                    nf = _fields(node)
+                    if "ref" in nf and "pin" in nf: yield "node", name, nf["ref"], nf["pin"]
+        else: heads.append(head)
+
+# --- CSV ---
+_CSV_COLUMNS = {"ref": ("ref", "reference", "designator", "refdes"), "value": ("value", "comment"),
+                "footprint": ("footprint", "package"), "net": ("net", "net name"), "pin": ("pin", "pin number")}
+
+def read_csv(f):
+    """The same records as read_kicad, from a CSV BOM / netlist."""
+    try: yield from _csv_records(csv.reader(f))
+    except csv.Error as e: raise ValueError(f"Bad CSV netlist: {e}") from None
+
+def _csv_records(reader):
+    header = [h.strip().lower() for h in next(reader, [])]
+    cols = {}
+    for field, names in _CSV_COLUMNS.items():
+        cols[field] = next((header.index(n) for n in names if n in header), None)
+    if cols["ref"] is None: raise ValueError("CSV netlist needs a ref / reference / designator column")
+    get = lambda row, field: row[cols[field]].strip() if cols[field] is not None and cols[field] < len(row) else ""
+    for row in reader:
+        refs = [r for r in re.split(r"[,;\s]+", get(row, "ref")) if r]
+        if get(row, "footprint"):
+            for ref in refs: yield "part", ref, get(row, "value"), get(row, "footprint")
+        if get(row, "net") and get(row, "pin") and len(refs) == 1: yield "node", get(row, "net"), refs[0], get(row, "pin")
+
+def read_netlist(path):
+    """Records of a .csv file, or of a KiCad netlist (anything else)."""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = read_csv if os.path.splitext(path)[1].lower() == ".csv" else read_kicad
+        yield from reader(f)
+
+# --- Library mapping ---
+class FootprintMapper:
+    """Picks a library part for a netlist part: an explicit footprint map entry, then a library key or part
+    name equal to the footprint (with or without its "Lib:" prefix), then the part of the reference's type
+    with the fewest pins that still has enough for the pins the nets use."""
+    def __init__(self, library, footprint_map=None):
+        self.library = library
+        self.footprint_map = footprint_map or {}
+        self._by_name = {}
+        self._by_type = {}      # comp_type -> [(pin count, key)], fewest pins first
+        for key in library.keys():
+            comp_type, name = library.info(key)
+            for n in (key, name): self._by_name.setdefault(n.lower(), key)
+            self._by_type.setdefault(comp_type, []).append((len(library.pin_names(key)), key))
+        for parts in self._by_type.values(): parts.sort()
+
+    def key_for(self, ref, footprint, pins_needed=0):
+        if footprint in self.footprint_map: return self.footprint_map[footprint]
+        for name in (footprint, footprint.split(":")[-1]):
+            if name.lower() in self._by_name: return self._by_name[name.lower()]
+        prefix = re.match(r"[A-Za-z]*", ref).group().upper()
+        for pins, key in self._by_type.get(REF_TYPES.get(prefix, "IC"), ()):
+            if pins >= pins_needed: return key
+        return None
+
+# --- Placement ---
+def _fits(board, comp, taken):
+    if comp.x < 0 or comp.y < 0 or comp.x + comp.width > board.width or comp.y + comp.height > board.height: return False
+    return all(not board.is_location_blocked(x, y) and (x, y) not in taken for x, y, _ in comp.iter_cells())
+
+def pack(board, parts, gap=PACK_GAP):
+    """Shelf packing of (ref, definition, value) parts, tallest first, left to right and top to bottom.
+    Only body cells are tested against the board and each other. Returns ({ref: component}, refs that did not fit);
+    the components get their reference as uid where it is free and nothing is added to the board."""
+    taken, placed, unplaced = set(), {}, []
+    uids = set()            # uids handed out so far; new_uid only knows the board's
+    x = y = shelf = 0
+    for ref, definition, value in sorted(parts, key=lambda p: (-p[1].height, -p[1].width)):
+        comp = PlacedComponent(definition, 0, 0, ref, 0, value=value)
+        state = x, y, shelf
+        while True:
+            if x + comp.width > board.width: x, y, shelf = 0, y + shelf + gap, 0
+            if y + comp.height > board.height: break
+            comp.x, comp.y = x, y
+            if _fits(board, comp, taken): break
+            x += 1
+        if y + comp.height > board.height:
+            # Later parts are no bigger, so they may still fit where this one did not
+            unplaced.append(ref)
+            x, y, shelf = state
+            continue
+        # Designators make readable uids; anything unusable as a canvas tag, or taken, gets a fresh one
+        if not re.fullmatch(r"[\w.+-]+", ref) or board.get_component(ref) or ref in uids: comp.uid = board.new_uid()
+        while comp.uid in uids: comp.uid = board.new_uid()
+        uids.add(comp.uid)
+        taken.update((cx, cy) for cx, cy, _ in comp.iter_cells())
+        placed[ref] = comp
+        x += comp.width + gap
+        shelf = max(shelf, comp.height)
+    return placed, unplaced
+
+def _pin_cells(comp):
+    """{pin label: board cell}, in the definition's label order."""
+    cells = {str(pin): (x, y) for x, y, pin in comp.iter_cells() if pin}
+    labels = dict.fromkeys(map(str, comp.definition.pin_labels.values()))
+    return {label: cells[label] for label in labels if label in cells}
+
+def import_netlist(board, path, library, footprint_map=None):
+    """Reads a netlist, maps its parts to library definitions and packs them onto board. Nothing is added to
+    the board: add result.comps (history.AddGroup) and result.nets (history.SetImportedNets), then route the
+    pairs from connections(board, result.nets)."""
+    parts, nodes = {}, []
+    for rec in read_netlist(path):
+        if rec[0] == "part": parts.setdefault(rec[1], rec[2:])
+        else: nodes.append(rec[1:])
+    pins_used = {}
+    for _, ref, pin in nodes: pins_used.setdefault(ref, set()).add(pin)
+
+    mapper = FootprintMapper(library, footprint_map)
+    to_place, unmapped = [], {}
+    for ref, (value, footprint) in parts.items():
+        key = mapper.key_for(ref, footprint, len(pins_used.get(ref, ())))
+        if key is None: unmapped[ref] = footprint
+        else: to_place.append((ref, library[key], value or None))
+    by_ref, unplaced = pack(board, to_place)
+
+    # Pins are matched by label, else by number in label order ("2" on a part labelled +/- is "-")
+    nets, missing, pin_cells = {}, [], {}
+    for net, ref, pin in nodes:
+        comp = by_ref.get(ref)
+        if comp is None: continue
+        if ref not in pin_cells: pin_cells[ref] = list(_pin_cells(comp))
+        labels = pin_cells[ref]
+        if pin in labels: label = pin
+        elif pin.isdigit() and 0 < int(pin) <= len(labels): label = labels[int(pin) - 1]
+        else:
+            missing.append((ref, pin))
+            continue
+        nets.setdefault(net, []).append((comp.uid, label))
+    nets = {net: tuple(dict.fromkeys(members)) for net, members in nets.items()}
+    return ImportResult(list(by_ref.values()), nets, unmapped, unplaced, missing)
+
+def connections(board, nets):
+    """(start cell, goal cell, net name) pairs still to route so each of nets ({name: ((uid, pin label), ...)},
+    like Board.imported_nets) is joined: a shortest spanning tree by grid distance, in which pins that wires already
+    join cost nothing and need no pair. Parts no longer on the board are left out."""
+    pairs, pin_cells = [], {}
+    for name, members in nets.items():
+        cells = []
+        for uid, label in members:
+            if uid not in pin_cells:
+                comp = board.get_component(uid)
+                pin_cells[uid] = _pin_cells(comp) if comp else {}
+            if label in pin_cells[uid]: cells.append(pin_cells[uid][label])
+        cells = list(dict.fromkeys(cells))
+        if len(cells) < 2: continue
+        roots = {c: board.net_at(*c) for c in cells}
+        cost = lambda a, b: 0 if roots[a] is not None and roots[a] == roots[b] else abs(a[0] - b[0]) + abs(a[1] - b[1])
+        # Prim's algorithm; nets are small enough for the quadratic version
+        dist = {c: (cost(cells[0], c), cells[0]) for c in cells[1:]}
+        while dist:
+            cell = min(dist, key=lambda c: dist[c][0])
+            d, src = dist.pop(cell)
+            if d: pairs.append((src, cell, name))
+            for c in dist:
+                d = cost(cell, c)
+                if d < dist[c][0]: dist[c] = (d, cell)
+    return pairs
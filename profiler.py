@@ -0,0 +1,93 @@
+# profiler.py
+# Optional frame-time instrumentation for PCBStudioApp. While enabled, the listed methods are replaced
+# on the app instance by timing wrappers and canvas create_* calls are counted; disabling removes them,
+# so a disabled profiler adds no work at all.
+import json
+import time
+from collections import deque
+
+PROFILE_HANDLERS = ("on_move", "on_click", "do_pan", "on_zoom", "_render_frame")
+PROFILE_PHASES = ("redraw_all", "_draw_board_layer", "_draw_holes_layer", "_draw_labels_layer",
+                  "_draw_wires_layer", "_draw_components_layer", "_draw_drc_layer", "redraw_overlay", "_update_ghost")
+CREATE_METHODS = ("create_line", "create_rectangle", "create_oval", "create_text", "create_image")
+TRACE_LIMIT = 50000         # spans kept for export
+HUD_REFRESH_MS = 250
+COLOR_HUD = "#FFEB3B"
+
+class Profiler:
+    def __init__(self, app):
+        self.app = app
+        self.enabled = False
+        self.spans = deque(maxlen=TRACE_LIMIT)  # (name, start, seconds, items created)
+        self.stats = {}         # name -> [calls, total s, last s, max s, items in last call]
+        self._created = 0
+        self._t0 = time.perf_counter()
+        self._hud_job = None
+
+    def enable(self):
+        if self.enabled: return
+        self.enabled = True
+        app, canvas = self.app, self.app.canvas
+        for name in PROFILE_HANDLERS + PROFILE_PHASES: setattr(app, name, self._timed(name, getattr(app, name)))
+        for name in CREATE_METHODS: setattr(canvas, name, self._counted(getattr(canvas, name)))
+        # Tk keeps the bound methods it was handed; binding again routes events through the wrappers
+        app._bind_events()
+        self._refresh_hud()
+
+    def disable(self):
+        if not self.enabled: return
+        self.enabled = False
+        app, canvas = self.app, self.app.canvas
+        for name in PROFILE_HANDLERS + PROFILE_PHASES: delattr(app, name)
+        for name in CREATE_METHODS: delattr(canvas, name)
+        app._bind_events()
+        if self._hud_job: app.root.after_cancel(self._hud_job); self._hud_job = None
+        canvas.delete("prof_hud")
+
+    def toggle(self): self.disable() if self.enabled else self.enable()
+
+    def reset(self):
+        self.spans.clear(); self.stats = {}
+
+    def _timed(self, name, fn):
+        def timed(*args, **kwargs):
+            created = self._created
+            start = time.perf_counter()
+            try: return fn(*args, **kwargs)
+            finally: self._record(name, start, time.perf_counter() - start, self._created - created)
+        return timed
+
+    def _counted(self, fn):
+        def create(*args, **kwargs):
+            self._created += 1
+            return fn(*args, **kwargs)
+        return create
+
+    def _record(self, name, start, dt, items):
+        self.spans.append((name, start, dt, items))
+        s = self.stats.get(name)
+        if s is None: s = self.stats[name] = [0, 0.0, 0.0, 0.0, 0]
+        s[0] += 1; s[1] += dt; s[2] = dt; s[3] = max(s[3], dt); s[4] = items
+
+    def summary(self):
+        lines = [f"{'(ms)':<24}{'last':>7}{'avg':>7}{'max':>7}{'items':>7}"]
+        for name in PROFILE_HANDLERS + PROFILE_PHASES:
+            s = self.stats.get(name)
+            if s: lines.append(f"{name.strip('_'):<24}{s[2]*1000:7.1f}{s[1]/s[0]*1000:7.1f}{s[3]*1000:7.1f}{s[4]:7d}")
+        return "\n".join(lines)
+
+    def _refresh_hud(self):
+        # Under the FRONT/BACK banner and DRC count; recreated here if a redraw_all cleared it
+        canvas = self.app.canvas
+        if not canvas.find_withtag("prof_hud"):
+            canvas.create_text(20, 65, text="", fill=COLOR_HUD, anchor="nw", font=("Courier", 9), tags=("hud", "prof_hud"))
+        canvas.itemconfig("prof_hud", text=self.summary())
+        self._hud_job = self.app.root.after(HUD_REFRESH_MS, self._refresh_hud)
+
+    def export_trace(self, path):
+        """Writes the recorded spans in Chrome trace-event format (chrome://tracing, Perfetto)."""
+        events = [{"name": name.strip("_"), "ph": "X", "pid": 1, "tid": 1,
+                   "ts": round((start - self._t0) * 1e6, 1), "dur": round(dt * 1e6, 1), "args": {"items": items}}
+                  for name, start, dt, items in self.spans]
+        with open(path, "w") as f: json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return len(events)
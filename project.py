@@ -0,0 +1,83 @@
+# project.py
+# Board project files: one JSON array per line, read and written as a stream.
+#   ["board", version, width, height]
+#   ["def", id, {ComponentDefinition.to_dict()}]          each definition once
+#   ["comp", def_id, uid, x, y, rotation, color, custom_width, custom_height, value]
+#   ["wire", name, color, side, [x0, y0, x1, y1, ...]]    points packed flat
+#   ["net", name, [[uid, pin label], ...]]               intended connections of an imported netlist (v2)
+import json
+import os
+from models import Board, ComponentDefinition, PlacedComponent, Wire
+
+PROJECT_EXT = ".pcb"
+FORMAT_VERSION = 2
+
+def _dump(record): return json.dumps(record, separators=(",", ":"))
+
+def iter_records(board):
+    """Yields the records of a board in file order (header, definitions, components, wires, nets)."""
+    yield ["board", FORMAT_VERSION, board.width, board.height]
+    def_ids = {}
+    for comp in board.components:
+        d = comp.definition
+        if id(d) not in def_ids:
+            def_ids[id(d)] = len(def_ids)
+            yield ["def", def_ids[id(d)], d.to_dict()]
+        yield ["comp", def_ids[id(d)], comp.uid, comp.x, comp.y, comp.rotation,
+               comp.custom_color, comp.custom_width, comp.custom_height, comp.value]
+    for wire in board.wires:
+        yield ["wire", wire.name, wire.color, wire.side, wire.coords.tolist()]
+    for name, members in board.imported_nets.items(): yield ["net", name, [list(m) for m in members]]
+
+def save_board(board, path):
+    # Write next to the target and swap in, so a crash never leaves half a project behind
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for rec in iter_records(board): f.write(_dump(rec) + "\n")
+    os.replace(tmp, path)
+
+def _match_library(d, library):
+    """Reuses an equal library definition so placements share its footprint cache."""
+    if not library: return d
+    for lib_def in library.definitions_named(d.name):
+        if lib_def.name == d.name and lib_def.to_dict() == d.to_dict(): return lib_def
+    return d
+
+class BoardReader:
+    """Builds a Board from project records applied one at a time."""
+    def __init__(self, library=None):
+        self.library = library
+        self.board = None
+        self.defs = {}
+
+    def apply(self, rec):
+        kind = rec[0]
+        if kind == "board":
+            if rec[1] > FORMAT_VERSION: raise ValueError(f"Project format v{rec[1]} is newer than this program")
+            self.board = Board(rec[2], rec[3])
+            return
+        if self.board is None: raise ValueError("Project file has no board header")
+        if kind == "def":
+            self.defs[rec[1]] = _match_library(ComponentDefinition.from_dict(rec[2]), self.library)
+        elif kind == "comp":
+            _, def_id, uid, x, y, rot, color, cw, ch, value = rec
+            comp = PlacedComponent(self.defs[def_id], x, y, uid, rot, color, cw, ch, value)
+            if not self.board.add_component_instance(comp): raise ValueError(f"Component {uid} does not fit on the board")
+        elif kind == "wire":
+            _, name, color, side, flat = rec
+            self.board.add_wire(Wire.from_coords(flat, name, color, side))
+        elif kind == "net":
+            # The board is still private to the reader, so its imported nets may be filled in place
+            self.board.imported_nets[rec[1]] = tuple((uid, pin) for uid, pin in rec[2])
+        else:
+            raise ValueError(f"Unknown record type {kind!r}")
+
+def load_board(path, library=None):
+    reader = BoardReader(library)
+    with open(path, "r", encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            if not line.strip(): continue
+            try: reader.apply(json.loads(line))
+            except (ValueError, KeyError, IndexError, TypeError) as e: raise ValueError(f"{path}:{n}: {e}") from e
+    if reader.board is None: raise ValueError(f"{path}: empty project file")
+    return reader.board
@@ -0,0 +1,349 @@
+# renderer.py
+# Board drawing shared by the Tk editor and headless export. Drawing only uses the
+# create_rectangle / create_oval / create_line / create_text subset of tk.Canvas, so a live
+# canvas, SvgCanvas or PostScriptCanvas can all be the backend. No tkinter import here.
+import argparse
+import math
+import os
+from xml.sax.saxutils import escape
+
+COLOR_PCB_BOARD = "#2E7D32"
+COLOR_PCB_TEXT = "#A5D6A7"
+COLOR_PAD = "#1B5E20"
+COLOR_PAD_HOLE = "#000000"
+COLOR_SELECT_HIGHLIGHT = "#00E5FF"
+COLOR_NET_HIGHLIGHT = "#B2FF59"
+
+LOD_SYMBOL_PX = 10      # R/C symbol polylines are skipped
+LOD_PIN_TEXT_PX = 14    # pin names on the solder side are skipped
+
+class SceneRenderer:
+    """Drawing code for one side of a board.
+
+    Mixed into PCBStudioApp and BoardView. Expects board, canvas, cell_size, scale, offset_x,
+    offset_y, is_back_view, selected_uids, selected_wires, _net_wires and _net_cells on self.
+    """
+    def _scene_tags(self, layer, *extra): return ("scene", layer) + extra
+    def _comp_tag(self, uid): return f"comp:{uid}"
+    def _wire_tag(self, wire): return f"wire:{id(wire)}"
+
+    def _put_in_layer(self, layer, tag_or_id):
+        pass # Only retained scenes need to restack new items
+
+    def logic_to_screen(self, lx, ly):
+        sz = self.cell_size * self.scale
+        draw_lx = (self.board.width - 1 - lx) if self.is_back_view else lx
+        return self.offset_x + draw_lx * sz, self.offset_y + ly * sz
+    def _board_rect(self, sz):
+        bx1 = self.offset_x; by1 = self.offset_y
+        return bx1, by1, bx1 + self.board.width * sz, by1 + self.board.height * sz
+
+    def _draw_board_layer(self, sz):
+        bx1, by1, bx2, by2 = self._board_rect(sz)
+        margin = sz * 1.0
+        self.canvas.create_rectangle(bx1-margin, by1-margin, bx2+margin, by2+margin, fill=COLOR_PCB_BOARD, outline="black", width=3, tags=self._scene_tags("board"))
+        self._put_in_layer("board", "board")
+
+    def _draw_labels_layer(self, sz, rect):
+        cols = self.board.width
+        bx1, by1, bx2, by2 = self._board_rect(sz)
+        margin = sz * 1.0
+        tags = self._scene_tags("labels")
+        for c in range(rect[0], rect[2] + 1):
+            cx, cy = self.logic_to_screen(c, 0); cx += sz/2
+            idx = (cols - 1 - c) if self.is_back_view else c
+            char = chr(ord('A') + (idx % 26))
+            self.canvas.create_text(cx, by1 - margin/2, text=char, fill=COLOR_PCB_TEXT, font=("Arial", 10, "bold"), tags=tags)
+            self.canvas.create_text(cx, by2 + margin/2, text=char, fill=COLOR_PCB_TEXT, font=("Arial", 10, "bold"), tags=tags)
+        for r in range(rect[1], rect[3] + 1):
+            cy = self.offset_y + r * sz + sz/2
+            self.canvas.create_text(bx1 - margin/2, cy, text=str(r+1), fill=COLOR_PCB_TEXT, font=("Arial", 10, "bold"), tags=tags)
+            self.canvas.create_text(bx2 + margin/2, cy, text=str(r+1), fill=COLOR_PCB_TEXT, font=("Arial", 10, "bold"), tags=tags)
+        self._put_in_layer("labels", "labels")
+
+    def _draw_holes_layer(self, sz, rect):
+        tags = self._scene_tags("holes")
+        for r in range(rect[1], rect[3] + 1):
+            for c in range(rect[0], rect[2] + 1):
+                x, y = self.logic_to_screen(c, r)
+                self.canvas.create_oval(x+2, y+2, x+sz-2, y+sz-2, fill=COLOR_PAD, outline="", tags=tags)
+                self.canvas.create_oval(x+sz/2-2, y+sz/2-2, x+sz/2+2, y+sz/2+2, fill=COLOR_PAD_HOLE, tags=tags)
+        self._put_in_layer("holes", "holes")
+
+    def _draw_wire(self, wire, sz):
+        # logic_to_screen of each point's cell centre, done over the flat coordinate array at once
+        f, half = wire.coords, sz / 2
+        ox, kx = (self.offset_x + (self.board.width - 1) * sz + half, -sz) if self.is_back_view else (self.offset_x + half, sz)
+        flat = [0.0] * len(f)
+        flat[0::2] = [ox + x * kx for x in f[0::2]]
+        flat[1::2] = [self.offset_y + half + y * sz for y in f[1::2]]
+        
+        if len(flat) >= 4:
+            tags = self._scene_tags("wires", self._wire_tag(wire))
+            active = (self.is_back_view and wire.side == "back") or (not self.is_back_view and wire.side == "front")
+            w_thick = 5 if active else 2 
+            selected = wire in self.selected_wires
+            lc = COLOR_SELECT_HIGHLIGHT if selected else COLOR_NET_HIGHLIGHT if wire in self._net_wires else wire.color
+            if selected: w_thick += 2
+            
+            self.canvas.create_line(flat, fill=lc, width=w_thick, capstyle="round", joinstyle="round", tags=tags)
+            
+            # Terminals
+            r_term = w_thick * 0.8
+            self.canvas.create_oval(flat[0]-r_term, flat[1]-r_term, flat[0]+r_term, flat[1]+r_term, fill=lc, outline="black", tags=tags)
+            self.canvas.create_oval(flat[-2]-r_term, flat[-1]-r_term, flat[-2]+r_term, flat[-1]+r_term, fill=lc, outline="black", tags=tags)
+            self._put_in_layer("wires", tags[-1])
+
+    def _draw_component(self, comp, sz, is_ghost=False, ghost_override_color=None):
+        layer = "overlay" if is_ghost else "components"
+        tags = self._scene_tags(layer, "ghost" if is_ghost else self._comp_tag(comp.uid))
+        color = comp.custom_color
+        is_transparent = comp.definition.comp_type in ["R", "C", "D"]
+        draw_fill = (not self.is_back_view) and (not is_transparent) and (not is_ghost)
+        draw_outline = self.is_back_view or is_ghost
+        min_x, min_y, max_x, max_y = 9999, 9999, -9999, -9999
+        
+        for rx, ry, pin in comp.footprint.cells:
+            abs_x, abs_y = comp.x + rx, comp.y + ry
+            sx, sy = self.logic_to_screen(abs_x, abs_y)
+            min_x = min(min_x, sx); min_y = min(min_y, sy)
+            max_x = max(max_x, sx+sz); max_y = max(max_y, sy+sz)
+
+            if draw_fill: self.canvas.create_rectangle(sx, sy, sx+sz, sy+sz, fill=color, outline="", tags=tags)
+            elif draw_outline: 
+                oc = ghost_override_color if ghost_override_color else "white"
+                self.canvas.create_rectangle(sx+2, sy+2, sx+sz-2, sy+sz-2, outline=oc, dash=(2,2), tags=tags)
+            
+            if comp.uid in self.selected_uids: self.canvas.create_rectangle(sx-1, sy-1, sx+sz+1, sy+sz+1, outline=COLOR_SELECT_HIGHLIGHT, width=2, tags=tags)
+            
+            if not (is_ghost and ghost_override_color):
+                if pin:
+                    pc = "#FFC107" if self.is_back_view else "#B0BEC5"
+                    pm = sz*0.3
+                    on_net = (abs_x, abs_y) in self._net_cells
+                    self.canvas.create_oval(sx+pm, sy+pm, sx+sz-pm, sy+sz-pm, fill=pc, outline=COLOR_NET_HIGHLIGHT if on_net else "black", width=2 if on_net else 1, tags=tags)
+                    if self.is_back_view and sz >= LOD_PIN_TEXT_PX: self.canvas.create_text(sx+sz/2, sy+sz/2, text=pin, font=("Arial", 8), tags=tags)
+
+        if not is_ghost and not self.is_back_view:
+            cx, cy = (min_x+max_x)/2, (min_y+max_y)/2
+            w_px = max_x - min_x; h_px = max_y - min_y
+            c_type = comp.definition.comp_type
+            if sz < LOD_SYMBOL_PX: pass
+            elif c_type == "R":
+                line_w = max(3, sz * 0.15); margin = sz * 0.2
+                if w_px > h_px:
+                    l = w_px - 2*margin; step = l/6; pts = [(min_x+margin, cy)]
+                    for i in range(1, 6): pts.append((min_x+margin + i*step, cy + ((sz*0.4) if i%2!=0 else -(sz*0.4))))
+                    pts.append((max_x-margin, cy)); self.canvas.create_line(pts, fill="black", width=line_w, capstyle="round", tags=tags)
+                else:
+                    l = h_px - 2*margin; step = l/6; pts = [(cx, min_y+margin)]
+                    for i in range(1, 6): pts.append((cx + ((sz*0.4) if i%2!=0 else -(sz*0.4)), min_y+margin + i*step))
+                    pts.append((cx, max_y-margin)); self.canvas.create_line(pts, fill="black", width=line_w, capstyle="round", tags=tags)
+            elif c_type == "C":
+                line_w = max(2, sz * 0.1); gap = sz * 0.3; plate_len = sz * 0.8
+                if w_px > h_px:
+                    self.canvas.create_line(min_x, cy, cx-gap, cy, width=line_w, tags=tags)
+                    self.canvas.create_line(max_x, cy, cx+gap, cy, width=line_w, tags=tags)
+                    self.canvas.create_line(cx-gap, cy-plate_len/2, cx-gap, cy+plate_len/2, width=line_w*2, tags=tags)
+                    self.canvas.create_line(cx+gap, cy-plate_len/2, cx+gap, cy+plate_len/2, width=line_w*2, tags=tags)
+                else:
+                    self.canvas.create_line(cx, min_y, cx, cy-gap, width=line_w, tags=tags)
+                    self.canvas.create_line(cx, max_y, cx, cy+gap, width=line_w, tags=tags)
+                    self.canvas.create_line(cx-plate_len/2, cy-gap, cx+plate_len/2, cy-gap, width=line_w*2, tags=tags)
+                    self.canvas.create_line(cx-plate_len/2, cy+gap, cx+plate_len/2, cy+gap, width=line_w*2, tags=tags)
+            font_size = max(8, int(9*self.scale))
+            text_str = comp.value
+            text_y = cy - sz * 0.6 if is_transparent and w_px > h_px else cy
+            text_x = cx if w_px > h_px else cx + sz * 0.6
+            self.canvas.create_text(text_x, text_y, text=text_str, fill="white", font=("Arial", font_size, "bold"), tags=tags)
+        self._put_in_layer(layer, tags[-1])
+
+    def _draw_banner(self):
+        txt = "BACK (SOLDER)" if self.is_back_view else "FRONT (COMPONENT)"
+        self.canvas.create_text(20, 20, text=txt, fill="white", anchor="w", font=("Arial", 14, "bold"), tags=("hud",))
+
+    def render(self):
+        """Draws the whole board in one pass, for backends that are written out afterwards."""
+        sz = self.cell_size * self.scale
+        rect = (0, 0, self.board.width - 1, self.board.height - 1)
+        self._draw_board_layer(sz)
+        self._draw_holes_layer(sz, rect)
+        self._draw_labels_layer(sz, rect)
+        for wire in self.board.wires: self._draw_wire(wire, sz)
+        for comp in self.board.components: self._draw_component(comp, sz)
+        self._draw_banner()
+
+class BoardView(SceneRenderer):
+    """A display-free view of a board, sized so the whole board, labels and banner fit."""
+    def __init__(self, board, is_back_view=False, cell_size=30):
+        self.board = board
+        self.is_back_view = is_back_view
+        self.cell_size = cell_size
+        self.scale = 1.0
+        self.offset_x = cell_size * 1.5
+        self.offset_y = cell_size * 2.5
+        self.selected_uids = set()
+        self.selected_wires = set()
+        self._net_wires = set(); self._net_cells = set()
+        self.canvas = None
+
+    @property
+    def page_size(self):
+        return self.offset_x * 2 + self.board.width * self.cell_size, self.offset_y + (self.board.height + 1.5) * self.cell_size
+
+    def render_to(self, canvas):
+        self.canvas = canvas
+        self.render()
+        return canvas
+
+# --- Backends ---
+
+def _flat_coords(args):
+    out = []
+    for a in args:
+        if isinstance(a, (list, tuple)): out.extend(_flat_coords(a))
+        else: out.append(float(a))
+    return out
+
+def _font_parts(font):
+    family, size = font[0], font[1]
+    return family, size, "bold" in font[2:]
+
+class SvgCanvas:
+    """Collects canvas calls as SVG elements."""
+    def __init__(self, width, height, background="#2E2E2E"):
+        self.width, self.height = width, height
+        self.elements = []
+        if background: self.create_rectangle(0, 0, width, height, fill=background, outline="")
+
+    def _stroke(self, color, width, dash):
+        if not color: return 'stroke="none"'
+        s = f'stroke="{color}" stroke-width="{width:g}"'
+        if dash: s += f' stroke-dasharray="{",".join(str(d) for d in dash)}"'
+        return s
+
+    def create_rectangle(self, *coords, fill="", outline="black", width=1, dash=None, **_):
+        x1, y1, x2, y2 = _flat_coords(coords)
+        self.elements.append(f'<rect x="{min(x1, x2):.2f}" y="{min(y1, y2):.2f}" width="{abs(x2-x1):.2f}" height="{abs(y2-y1):.2f}" '
+                             f'fill="{fill or "none"}" {self._stroke(outline, width, dash)}/>')
+
+    def create_oval(self, *coords, fill="", outline="black", width=1, dash=None, **_):
+        x1, y1, x2, y2 = _flat_coords(coords)
+        self.elements.append(f'<ellipse cx="{(x1+x2)/2:.2f}" cy="{(y1+y2)/2:.2f}" rx="{abs(x2-x1)/2:.2f}" ry="{abs(y2-y1)/2:.2f}" '
+                             f'fill="{fill or "none"}" {self._stroke(outline, width, dash)}/>')
+
+    def create_line(self, *coords, fill="black", width=1, dash=None, capstyle="butt", joinstyle="round", **_):
+        c = _flat_coords(coords)
+        pts = " ".join(f"{c[i]:.2f},{c[i+1]:.2f}" for i in range(0, len(c), 2))
+        cap = {"projecting": "square"}.get(capstyle, capstyle)
+        self.elements.append(f'<polyline points="{pts}" fill="none" {self._stroke(fill, width, dash)} '
+                             f'stroke-linecap="{cap}" stroke-linejoin="{joinstyle}"/>')
+
+    def create_text(self, x, y, text="", fill="black", font=("Arial", 10), anchor="center", **_):
+        family, size, bold = _font_parts(font)
+        h = "start" if "w" in anchor else "end" if "e" in anchor else "middle"
+        v = "hanging" if "n" in anchor else "text-after-edge" if "s" in anchor else "central"
+        weight = ' font-weight="bold"' if bold else ""
+        self.elements.append(f'<text x="{x:.2f}" y="{y:.2f}" fill="{fill}" font-family="{family}" font-size="{size * 4 / 3:.1f}"{weight} '
+                             f'text-anchor="{h}" dominant-baseline="{v}">{escape(str(text))}</text>')
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{self.width:.0f}" height="{self.height:.0f}" '
+                    f'viewBox="0 0 {self.width:.0f} {self.height:.0f}">\n')
+            for el in self.elements: f.write(el + "\n")
+            f.write("</svg>\n")
+
+_PS_NAMED = {"white": (1, 1, 1), "black": (0, 0, 0), "red": (1, 0, 0), "green": (0, 0.5, 0), "blue": (0, 0, 1), "yellow": (1, 1, 0)}
+
+def _ps_rgb(color):
+    if color.startswith("#"):
+        h = color[1:]
+        if len(h) == 3: h = "".join(ch * 2 for ch in h)
+        return tuple(int(h[i:i+2], 16) / 255 for i in (0, 2, 4))
+    return _PS_NAMED.get(color.lower(), (0, 0, 0))
+
+class PostScriptCanvas:
+    """Collects canvas calls as an Encapsulated PostScript page (1 px = 1 pt, y flipped)."""
+    _PROLOG = ("/ell { matrix currentmatrix 5 1 roll 4 2 roll translate scale 0 0 1 0 360 arc closepath setmatrix } def\n"
+               "/ctext { dup stringwidth pop 2 div neg 0 rmoveto show } def\n"
+               "/rtext { dup stringwidth pop neg 0 rmoveto show } def\n")
+
+    def __init__(self, width, height, background="#2E2E2E"):
+        self.width, self.height = width, height
+        self.ops = []
+        if background: self.create_rectangle(0, 0, width, height, fill=background, outline="")
+
+    def _pt(self, x, y): return f"{x:.2f} {self.height - y:.2f}"
+
+    def _paint(self, fill, outline, width, dash):
+        if fill: self.ops.append("gsave %.3f %.3f %.3f setrgbcolor fill grestore" % _ps_rgb(fill))
+        if outline:
+            d = " ".join(str(v) for v in dash) if dash else ""
+            self.ops.append("%.3f %.3f %.3f setrgbcolor %g setlinewidth [%s] 0 setdash stroke" % (*_ps_rgb(outline), width, d))
+        self.ops.append("newpath")
+
+    def create_rectangle(self, *coords, fill="", outline="black", width=1, dash=None, **_):
+        x1, y1, x2, y2 = _flat_coords(coords)
+        self.ops.append(f"newpath {self._pt(x1, y1)} moveto {self._pt(x2, y1)} lineto {self._pt(x2, y2)} lineto {self._pt(x1, y2)} lineto closepath")
+        self._paint(fill, outline, width, dash)
+
+    def create_oval(self, *coords, fill="", outline="black", width=1, dash=None, **_):
+        x1, y1, x2, y2 = _flat_coords(coords)
+        self.ops.append(f"newpath {self._pt((x1+x2)/2, (y1+y2)/2)} {abs(x2-x1)/2:.2f} {max(abs(y2-y1), 0.01)/2:.2f} ell")
+        self._paint(fill, outline, width, dash)
+
+    def create_line(self, *coords, fill="black", width=1, dash=None, capstyle="butt", joinstyle="round", **_):
+        c = _flat_coords(coords)
+        path = [f"{self._pt(c[0], c[1])} moveto"] + [f"{self._pt(c[i], c[i+1])} lineto" for i in range(2, len(c), 2)]
+        cap = {"butt": 0, "round": 1, "projecting": 2}.get(capstyle, 0)
+        join = {"miter": 0, "round": 1, "bevel": 2}.get(joinstyle, 1)
+        self.ops.append(f"newpath {' '.join(path)} {cap} setlinecap {join} setlinejoin")
+        self._paint("", fill, width, dash)
+
+    def create_text(self, x, y, text="", fill="black", font=("Arial", 10), anchor="center", **_):
+        _, size, bold = _font_parts(font)
+        s = str(text).replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        dy = size * 0.8 if "n" in anchor else 0 if "s" in anchor else size * 0.35
+        show = "show" if "w" in anchor else "rtext" if "e" in anchor else "ctext"
+        self.ops.append("/%s findfont %g scalefont setfont %.3f %.3f %.3f setrgbcolor %s moveto (%s) %s"
+                        % ("Helvetica-Bold" if bold else "Helvetica", size, *_ps_rgb(fill), self._pt(x, y + dy), s, show))
+
+    def save(self, path):
+        with open(path, "w", encoding="latin-1", errors="replace") as f:
+            f.write("%!PS-Adobe-3.0 EPSF-3.0\n")
+            f.write(f"%%BoundingBox: 0 0 {math.ceil(self.width)} {math.ceil(self.height)}\n%%EndComments\n")
+            f.write(self._PROLOG)
+            for op in self.ops: f.write(op + "\n")
+            f.write("showpage\n%%EOF\n")
+
+BACKENDS = {".svg": SvgCanvas, ".ps": PostScriptCanvas, ".eps": PostScriptCanvas}
+
+def export_board(board, path, view="front", cell_size=30):
+    """Renders the front or mirrored back view of a board to an .svg, .ps or .eps file."""
+    backend = BACKENDS.get(os.path.splitext(path)[1].lower())
+    if backend is None: raise ValueError(f"Unsupported export format: {path} (use {', '.join(BACKENDS)})")
+    bv = BoardView(board, is_back_view=(view == "back"), cell_size=cell_size)
+    bv.render_to(backend(*bv.page_size)).save(path)
+
+def export_main(argv):
+    """Command line: main.py export BOARD.pcb [--view front|back|both] [--out FILE]"""
+    from project import load_board
+    ap = argparse.ArgumentParser(prog="main.py export", description="Render a board to SVG/PostScript without a display.")
+    ap.add_argument("board", help="project file (.pcb)")
+    ap.add_argument("--view", choices=["front", "back", "both"], default="both")
+    ap.add_argument("--out", help="output file; with --view both, _front/_back is added before the extension")
+    ap.add_argument("--cell-size", type=int, default=30, help="pixels (points) per grid cell")
+    args = ap.parse_args(argv)
+
+    try: board = load_board(args.board)
+    except (OSError, ValueError) as e: ap.exit(1, f"error: {e}\n")
+    out = args.out or os.path.splitext(args.board)[0] + ".svg"
+    views = ["front", "back"] if args.view == "both" else [args.view]
+    for view in views:
+        path = out
+        if len(views) > 1: base, ext = os.path.splitext(out); path = f"{base}_{view}{ext}"
+        try: export_board(board, path, view, args.cell_size)
+        except (OSError, ValueError) as e: ap.exit(1, f"error: {e}\n")
+        print(path)
+    return 0
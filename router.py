@@ -0,0 +1,127 @@
+# router.py
+# Grid maze autorouter: shortest orthogonal paths between pins (A* over board cells).
+# Blocked cells: component bodies and other parts' pins, plus every cell already crossed by a wire on the same side.
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+from models import Wire
+
+BATCH_PARALLEL_MIN = 16     # below this many requests a pool costs more than it saves
+
+def segment_cells(p1, p2):
+    """Grid cells a wire segment passes over (exact for orthogonal segments, stepped for diagonals)."""
+    (x1, y1), (x2, y2) = p1, p2
+    n = int(max(abs(x2 - x1), abs(y2 - y1)))
+    if n == 0: return [(round(x1), round(y1))]
+    return [(round(x1 + (x2 - x1) * i / n), round(y1 + (y2 - y1) * i / n)) for i in range(n + 1)]
+
+class RoutingGrid:
+    """Obstacle map for one side of a board. Plain bytes, so it can be shipped to worker processes."""
+    def __init__(self, width, height, blocked=None):
+        self.width, self.height = width, height
+        self.blocked = bytearray(blocked) if blocked is not None else bytearray(width * height)
+
+    @classmethod
+    def from_board(cls, board, side, block_bodies=True):
+        grid = cls(board.width, board.height)
+        for idx, hit in enumerate(board._cells):
+            # Pins block too: running over another pin would short it. The pins being joined are freed per route.
+            if hit is not None and (block_bodies or hit[1] is not None): grid.blocked[idx] = 1
+        for wire in board.wires:
+            if wire.side == side: grid.mark(wire.points)
+        return grid
+
+    def mark(self, points):
+        for i in range(len(points) - 1):
+            for x, y in segment_cells(points[i], points[i+1]):
+                if 0 <= x < self.width and 0 <= y < self.height: self.blocked[y * self.width + x] = 1
+
+    def is_clear(self, path, start, goal):
+        """Whether a path (corner points) crosses no blocked cell other than its own end pins."""
+        w, blocked = self.width, self.blocked
+        for i in range(len(path) - 1):
+            for x, y in segment_cells(path[i], path[i+1]):
+                if (x, y) != start and (x, y) != goal and blocked[y * w + x]: return False
+        return True
+
+    def route(self, start, goal):
+        """Corner points of a shortest 4-connected path from start to goal, or None if there is none."""
+        w, h, blocked = self.width, self.height, self.blocked
+        (sx, sy), (gx, gy) = start, goal
+        if not (0 <= sx < w and 0 <= sy < h and 0 <= gx < w and 0 <= gy < h): return None
+        s, g = sy * w + sx, gy * w + gx
+        came = {s: -1}
+        cost = {s: 0}
+        # Heap entries: (f, -g, bends, seq, cell, direction); deeper nodes first on ties keeps A* from flooding
+        heap = [(abs(gx - sx) + abs(gy - sy), 0, 0, 0, s, -1)]
+        seq = 0
+        while heap:
+            _, neg_g, bends, _, cur, d = heapq.heappop(heap)
+            if cur == g: return _corners(_cells(came, cur, w))
+            gc = -neg_g
+            if gc > cost[cur]: continue
+            cx, cy = cur % w, cur // w
+            for nd, (dx, dy) in enumerate(((1, 0), (-1, 0), (0, 1), (0, -1))):
+                nx, ny = cx + dx, cy + dy
+                if not (0 <= nx < w and 0 <= ny < h): continue
+                n = ny * w + nx
+                if blocked[n] and n != g: continue
+                ng = gc + 1
+                if ng < cost.get(n, ng + 1):
+                    cost[n] = ng; came[n] = cur; seq += 1
+                    heapq.heappush(heap, (ng + abs(gx - nx) + abs(gy - ny), -ng, bends + (nd != d), seq, n, nd))
+        return None
+
+    def route_all(self, requests):
+        """Routes (start, goal) pairs in order; each found path becomes an obstacle for the ones after it."""
+        paths = []
+        for start, goal in requests:
+            path = self.route(tuple(start), tuple(goal))
+            if path: self.mark(path)
+            paths.append(path)
+        return paths
+
+def _cells(came, cur, w):
+    out = []
+    while cur != -1: out.append((cur % w, cur // w)); cur = came[cur]
+    return out[::-1]
+
+def _corners(cells):
+    if len(cells) < 3: return cells
+    pts = [cells[0]]
+    for a, b, c in zip(cells, cells[1:], cells[2:]):
+        if (b[0] - a[0], b[1] - a[1]) != (c[0] - b[0], c[1] - b[1]): pts.append(b)
+    pts.append(cells[-1])
+    return pts
+
+def _route_chunk(width, height, blocked, requests):
+    return RoutingGrid(width, height, blocked).route_all(requests)
+
+def route_many(grid, requests, jobs=None):
+    """Routes many pin pairs, in a process pool when there are enough of them. Returns paths in request order.
+
+    Chunks are routed in parallel against the same starting grid. The results are then accepted in request
+    order, and a path that runs into an earlier accepted one is routed again here, against the grid as it
+    is by then. grid is updated with every accepted path."""
+    requests = [(tuple(a), tuple(b)) for a, b in requests]
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(requests) < BATCH_PARALLEL_MIN: return grid.route_all(requests)
+    size = -(-len(requests) // jobs)
+    chunks = [requests[i:i+size] for i in range(0, len(requests), size)]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(_route_chunk, grid.width, grid.height, bytes(grid.blocked), c) for c in chunks]
+        proposed = [path for f in futures for path in f.result()]
+    paths = []
+    for (start, goal), path in zip(requests, proposed):
+        if path is None or not grid.is_clear(path, start, goal):
+            path = grid.route(start, goal)
+        if path: grid.mark(path)
+        paths.append(path)
+    return paths
+
+def make_wire(board, path, side, serial=0, name=None):
+    """A Wire for a routed path, named name or else after a net it joins if there is one (as finish_wire does).
+    serial numbers the fallback names of several wires made before any of them is added."""
+    names = [name] if name else [w.name for p in (path[0], path[-1]) for w in board.wires_at(*p)]
+    name = names[0] if names else f"N{len(board.wires) + serial}"
+    return Wire(list(path), name, "#2980B9" if side == "back" else "#C0392B", side)
@@ -0,0 +1,50 @@
+# Autosave writer against a journal directory that comes and goes; run with python -m unittest discover tests
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from autosave import Autosave, recover
+from history import History, AddComponent
+from library import LibraryStore
+from models import Board, PlacedComponent
+
+def wait_for(check, timeout=5):
+    end = time.monotonic() + timeout
+    while not check() and time.monotonic() < end: time.sleep(0.01)
+    return check()
+
+class AutosaveWriteErrorTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.library = LibraryStore(os.path.join(self.dir.name, "lib"))
+        self.board = Board(30, 20)
+        self.history = History()
+
+    def tearDown(self): self.dir.cleanup()
+
+    def place(self, autosave, x):
+        definition = self.library[next(iter(self.library))]
+        comp = PlacedComponent(definition, x, 0, None, 0)
+        self.history.do(AddComponent(self.board, comp))
+        autosave.record(self.board, [comp.uid])
+
+    def test_writer_survives_missing_directory(self):
+        folder = os.path.join(self.dir.name, "gone")
+        autosave = Autosave(os.path.join(folder, "autosave"))
+        autosave.reset(self.board)
+        self.place(autosave, 0)
+        self.assertTrue(wait_for(lambda: autosave.error is not None))
+        self.assertTrue(autosave._thread.is_alive())
+        # Once the directory is back the next batch rewrites everything, including the edit that failed
+        os.mkdir(folder)
+        self.place(autosave, 10)
+        self.assertTrue(wait_for(lambda: autosave.error is None))
+        autosave.close(discard=False)
+        self.assertFalse(autosave._thread.is_alive())
+        recovered = recover(os.path.join(folder, "autosave"), self.library)
+        self.assertEqual(sorted(c.uid for c in recovered.components), sorted(c.uid for c in self.board.components))
+
+if __name__ == "__main__": unittest.main()
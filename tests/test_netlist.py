@@ -0,0 +1,60 @@
+# Netlist import against a real Board; run with python -m unittest discover tests
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import netlist
+from autosave import Autosave, recover
+from history import History, AddGroup, SetImportedNets, Batch
+from library import LibraryStore
+from models import Board
+
+KICAD = """(export (version "E")
+  (components
+    (comp (ref "R1") (value "10k") (footprint "Resistor_THT:Resistor"))
+    (comp (ref "D1") (value "red") (footprint "LED_THT:LED")))
+  (nets
+    (net (code "1") (name "/VCC") (node (ref "R1") (pin "1")) (node (ref "D1") (pin "1")))))
+"""
+
+class NetlistImportTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "design.net")
+        with open(self.path, "w", encoding="utf-8") as f: f.write(KICAD)
+        self.library = LibraryStore(os.path.join(self.dir.name, "lib"))
+        self.board = Board(30, 20)
+        self.history = History()
+
+    def tearDown(self): self.dir.cleanup()
+
+    def do_import(self):
+        result = netlist.import_netlist(self.board, self.path, self.library)
+        self.history.do(Batch([AddGroup(self.board, result.comps), SetImportedNets(self.board, result.nets)]))
+        return result
+
+    def test_import_keeps_board_netlist_method(self):
+        result = self.do_import()
+        self.assertEqual(len(result.comps), 2)
+        self.assertEqual(self.board.imported_nets, {"/VCC": (("R1", "1"), ("D1", "A"))})
+        self.assertEqual(self.board.netlist(), {})      # no wires yet, so no routed nets
+        self.assertEqual(len(netlist.connections(self.board, self.board.imported_nets)), 1)
+
+    def test_journal_follows_imported_nets_through_undo(self):
+        base = os.path.join(self.dir.name, "autosave")
+        autosave = Autosave(base)
+        autosave.reset(self.board)
+        result = self.do_import()
+        autosave.record(self.board, [c.uid for c in result.comps])
+        nets = self.board.imported_nets
+        autosave.record(self.board, self.history.undo()[0])
+        self.assertEqual(self.board.imported_nets, {})
+        autosave.record(self.board, self.history.redo()[0])
+        autosave.close(discard=False)
+        recovered = recover(base, self.library)
+        self.assertEqual(recovered.imported_nets, nets)
+        self.assertEqual(sorted(c.uid for c in recovered.components), ["D1", "R1"])
+
+if __name__ == "__main__": unittest.main()